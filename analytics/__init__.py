@@ -0,0 +1,35 @@
+# analytics/__init__.py
+"""Lógica de datos del dashboard, independiente de Streamlit."""
+from .acs import (CITY_METRICS, CityMetric, CityTable, RacePopulation, build_city_table,
+                  build_race_population, build_state_metrics, grouped_stats, parse_numeric, state_rollup)
+from .citymatch import CityIndex, city_key, match_cities
+from .cohorts import Cohort, CohortIndex, build_cohort_index
+from .cube import StateCube, build_state_cube
+from .dataset import Dataset, DatasetError, append_incidents, build_dataset, load_dir, load_sources
+from .diagnostics import Tracer
+from .ingest import content_hash, file_hash, load_csv, normalize_columns
+from .registry import DatasetRegistry
+from .schema import INCIDENT_SCHEMA, apply_schema
+from .states import StateDim, build_state_dim
+from .stats import correlation_matrix, correlation_table
+from .stream import QuantileSketch, stream_state_metrics
+from .timeseries import DailySeries, build_daily_series
+from .weapons import WEAPON_CLASSES, classify
+
+__all__ = [
+    "CITY_METRICS", "CityMetric", "CityTable", "RacePopulation", "build_city_table",
+    "build_race_population", "build_state_metrics", "grouped_stats", "parse_numeric", "state_rollup",
+    "CityIndex", "city_key", "match_cities",
+    "Cohort", "CohortIndex", "build_cohort_index",
+    "StateCube", "build_state_cube",
+    "Dataset", "DatasetError", "append_incidents", "build_dataset", "load_dir", "load_sources",
+    "Tracer",
+    "content_hash", "file_hash", "load_csv", "normalize_columns",
+    "DatasetRegistry",
+    "INCIDENT_SCHEMA", "apply_schema",
+    "StateDim", "build_state_dim",
+    "correlation_matrix", "correlation_table",
+    "QuantileSketch", "stream_state_metrics",
+    "DailySeries", "build_daily_series",
+    "WEAPON_CLASSES", "classify",
+]
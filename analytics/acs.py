@@ -0,0 +1,235 @@
+# analytics/acs.py
+"""Archivos ACS a nivel ciudad (~29k filas) -> estadísticas por estado (51 filas).
+
+Pipeline declarativa: cada métrica se describe en `CITY_METRICS` (archivo de
+origen, columnas candidatas, estadístico principal). Los cuatro archivos
+(ingreso, % raza, pobreza, preparatoria) comparten una sola llave
+(state_id, ciudad) y se agregan en una pasada.
+
+Las reducciones por grupo (conteo, media, mediana, media ponderada) se hacen con
+NumPy sobre `state_id`, sin groupby fila por fila, y el texto no numérico
+("-", "(X)", "250,000+") se interpreta una vez por valor distinto.
+
+`RacePopulation` convierte los % de raza por estado en población por raza
+(matriz densa estado × raza) para usarla como denominador de tasas.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .states import StateDim
+
+# Marcadores del Census que significan "sin dato"
+MISSING_MARKERS = ("", "-", "(X)", "N/A", "NA", "**", "***", "null")
+
+INCOME_COLS = ("median_income", "median_household_income_2015", "median_household_income")
+WEIGHT_COLS = ("population", "total_population", "population_2015", "pop")
+STATE_COLS = ("geographic_area", "state", "state_name")
+CITY_COLS = ("city",)
+
+# Código de raza (Races.csv) -> columna de % en ShareRaceByCity2
+RACE_SHARE_COLS = {
+    "W": "share_white",
+    "B": "share_black",
+    "NA": "share_native_american",
+    "A": "share_asian",
+    "H": "share_hispanic",
+}
+
+
+@dataclass(frozen=True)
+class CityMetric:
+    source: str                   # archivo lógico: "income", "race_share", "poverty", "hs"
+    label: str                    # texto para ejes/leyendas
+    candidates: tuple             # nombres posibles de la columna (ya normalizados)
+    stat: str = "mean"            # estadístico principal del rollup estatal: "mean" o "median"
+
+
+# Llave = nombre de la columna de salida
+CITY_METRICS = {
+    "median_income": CityMetric("income", "Ingreso mediano 2015 (USD)", INCOME_COLS, "median"),
+    "share_white": CityMetric("race_share", "% población blanca", ("share_white",)),
+    "share_black": CityMetric("race_share", "% población negra", ("share_black",)),
+    "share_native_american": CityMetric("race_share", "% población nativa americana", ("share_native_american",)),
+    "share_asian": CityMetric("race_share", "% población asiática", ("share_asian",)),
+    "share_hispanic": CityMetric("race_share", "% población hispana", ("share_hispanic",)),
+    "poverty_rate": CityMetric("poverty", "% bajo la línea de pobreza", ("poverty_rate", "percent_below_poverty")),
+    "percent_completed_hs": CityMetric("hs", "% mayores de 25 con preparatoria", ("percent_completed_hs",)),
+}
+
+
+def _first(columns, candidates):
+    return next((c for c in candidates if c in columns), None)
+
+
+def parse_numeric(values: pd.Series) -> np.ndarray:
+    """Columna ACS -> float64. Cotas tipo '250,000+' o '2,500-' se toman como el número."""
+    if pd.api.types.is_numeric_dtype(values.dtype) and not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.to_numpy(dtype=float, na_value=np.nan)
+    codes, uniques = pd.factorize(values)
+    text = pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.strip()
+    text = text.mask(text.isin(MISSING_MARKERS))
+    parsed = pd.to_numeric(text.str.replace(r"[,$+]", "", regex=True).str.rstrip("-"),
+                           errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    return np.append(parsed, np.nan)[codes]  # código -1 (NaN) -> último elemento
+
+
+def grouped_stats(ids: np.ndarray, values: np.ndarray, n_groups: int,
+                  weights: np.ndarray | None = None) -> dict:
+    """count/n_valid/mean/median (y weighted_mean si hay pesos) por grupo 0..n_groups-1.
+
+    Filas con id < 0 se ignoran; grupos sin valores válidos quedan en NaN.
+    """
+    ids = np.asarray(ids)
+    in_dim = ids >= 0
+    count = np.bincount(ids[in_dim], minlength=n_groups)
+
+    ok = in_dim & ~np.isnan(values)
+    g, v = ids[ok], values[ok]
+    n_valid = np.bincount(g, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(g, weights=v, minlength=n_groups) / n_valid
+
+    # mediana: ordenar por (grupo, valor) y tomar el/los elementos centrales de cada bloque
+    order = np.lexsort((v, g))
+    v_sorted = v[order]
+    starts = np.concatenate(([0], np.cumsum(n_valid)[:-1]))
+    has = n_valid > 0
+    median = np.full(n_groups, np.nan)
+    lo = starts[has] + (n_valid[has] - 1) // 2
+    hi = starts[has] + n_valid[has] // 2
+    median[has] = (v_sorted[lo] + v_sorted[hi]) / 2
+
+    out = {"count": count, "n_valid": n_valid, "mean": mean, "median": median}
+    if weights is not None:
+        w = np.asarray(weights, dtype=float)[ok]
+        w_ok = ~np.isnan(w)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out["weighted_mean"] = (np.bincount(g[w_ok], weights=v[w_ok] * w[w_ok], minlength=n_groups)
+                                    / np.bincount(g[w_ok], weights=w[w_ok], minlength=n_groups))
+    return out
+
+
+@dataclass(frozen=True)
+class CityTable:
+    """Una fila por (state_id, ciudad) con todas las métricas disponibles alineadas."""
+    state_id: np.ndarray          # (C,)
+    city: np.ndarray              # (C,) nombre tal como viene en el primer archivo que la trae
+    values: dict                  # columna -> (C,) float64, NaN si el archivo no trae la ciudad
+    weights: np.ndarray | None    # (C,) población de la ciudad si algún archivo la trae
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame({"state_id": self.state_id, "city": self.city, **self.values})
+
+
+def build_city_table(frames: dict, dim: StateDim) -> CityTable:
+    """frames: archivo lógico -> DataFrame normalizado (ver `CityMetric.source`)."""
+    parts = []  # (source, state_ids, ciudades, df)
+    for source, df in frames.items():
+        if df is None:
+            continue
+        city_col = _first(df.columns, CITY_COLS)
+        if "state_id" in df.columns:
+            ids = df["state_id"].to_numpy()
+        else:
+            state_col = _first(df.columns, STATE_COLS)
+            if state_col is None:
+                continue
+            ids = dim.encode(df[state_col])
+        cities = (df[city_col].astype("string").str.strip() if city_col
+                  else pd.Series(pd.NA, index=df.index, dtype="string"))
+        parts.append((source, np.asarray(ids, dtype=np.int64), cities, df))
+
+    if not parts:
+        return CityTable(np.array([], dtype=np.intp), np.array([], dtype=object), {}, None)
+
+    # llave compartida (state_id, ciudad): vocabulario global de ciudades + un entero por par
+    city_codes, vocab = pd.factorize(pd.concat([p[2] for p in parts], ignore_index=True))
+    all_ids = np.concatenate([p[1] for p in parts])
+    combined = all_ids * (len(vocab) + 1) + (city_codes + 1)
+    keys, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+    C = len(keys)
+
+    city_names = np.append(np.asarray(vocab, dtype=object), None)[city_codes][first]
+    state_id = all_ids[first]
+
+    values, weights = {}, None
+    offset = 0
+    for source, ids, _, df in parts:
+        rows = inverse[offset:offset + len(df)]
+        offset += len(df)
+        for col, spec in CITY_METRICS.items():
+            if spec.source != source:
+                continue
+            src_col = _first(df.columns, spec.candidates)
+            if src_col is None:
+                continue
+            arr = values.setdefault(col, np.full(C, np.nan))
+            arr[rows] = parse_numeric(df[src_col])
+        weight_col = _first(df.columns, WEIGHT_COLS)
+        if weight_col is not None:
+            if weights is None:
+                weights = np.full(C, np.nan)
+            weights[rows] = parse_numeric(df[weight_col])
+    return CityTable(state_id=state_id, city=city_names, values=values, weights=weights)
+
+
+def state_rollup(table: CityTable, dim: StateDim) -> pd.DataFrame:
+    """Tabla de 51 filas alineada con `dim` (índice = state_id).
+
+    Por métrica: `<col>` (estadístico principal), `<col>_median`, `<col>_mean`,
+    `<col>_n` (ciudades con dato) y `<col>_weighted` si hay población por ciudad.
+    `n_cities` es el total de ciudades conocidas en cualquiera de los archivos.
+    """
+    S = len(dim)
+    in_dim = table.state_id >= 0
+    out = {
+        "state_id": np.arange(S),
+        "state": dim.codes,
+        "state_name": dim.names,
+        "n_cities": np.bincount(table.state_id[in_dim], minlength=S),
+    }
+    for col, values in table.values.items():
+        s = grouped_stats(table.state_id, values, S, table.weights)
+        out[col] = s[CITY_METRICS[col].stat]
+        out[f"{col}_median"] = s["median"]
+        out[f"{col}_mean"] = s["mean"]
+        out[f"{col}_n"] = s["n_valid"]
+        if "weighted_mean" in s:
+            out[f"{col}_weighted"] = s["weighted_mean"]
+    return pd.DataFrame(out)
+
+
+@dataclass(frozen=True)
+class RacePopulation:
+    """Población estimada por estado y raza: población 2015 × % de la raza en el estado."""
+    codes: np.ndarray        # (R,) códigos de raza, columnas de `population`
+    population: np.ndarray   # (S, R) NaN si el estado no tiene dato
+    weighted: bool           # True si el % se ponderó por población de ciudad
+
+    def denominator(self, races) -> np.ndarray:
+        """(S,) población sumada de `races`; NaN si alguna raza no tiene denominador."""
+        idx = [np.flatnonzero(self.codes == str(r).upper()) for r in races]
+        if not idx or any(len(i) == 0 for i in idx):
+            return np.full(len(self.population), np.nan)
+        return self.population[:, np.concatenate(idx)].sum(axis=1)
+
+
+def build_race_population(state_metrics: pd.DataFrame | None, dim: StateDim) -> RacePopulation | None:
+    """Matriz estado × raza desde el rollup estatal; usa el % ponderado por población si existe."""
+    if state_metrics is None:
+        return None
+    cols = {code: col for code, col in RACE_SHARE_COLS.items() if col in state_metrics.columns}
+    if not cols:
+        return None
+    weighted = all(f"{col}_weighted" in state_metrics.columns for col in cols.values())
+    shares = np.column_stack([state_metrics[f"{col}_weighted" if weighted else f"{col}_mean"].to_numpy(dtype=float)
+                              for col in cols.values()])
+    return RacePopulation(codes=np.array(list(cols), dtype=object),
+                          population=dim.population[:, None] * shares / 100, weighted=weighted)
+
+
+def build_state_metrics(frames: dict, dim: StateDim) -> pd.DataFrame:
+    """CSV por ciudad ya cargados -> métricas tipadas -> rollup estatal, en una sola llamada."""
+    return state_rollup(build_city_table(frames, dim), dim)
@@ -0,0 +1,364 @@
+# analytics/api.py
+"""API HTTP/JSON local con los mismos agregados que el dashboard (sin Streamlit).
+
+    python -m analytics serve --port 8765
+
+Un proceso con un `DatasetRegistry` en memoria (CSV incluidos o DASHBOARD_DATA_DIR)
+y un servidor asyncio de la biblioteca estándar (HTTP/1.1, keep-alive, solo GET).
+Las respuestas se guardan ya serializadas en un LRU por (versión de datos, ruta,
+parámetros): una consulta repetida no toca pandas. El loop solo consulta ese LRU
+con la última versión de datos vista; el registro (hashes, construcción) y los
+cálculos nuevos corren en un hilo aparte para no bloquearlo.
+
+Rutas (todas aceptan `year`; por defecto el primer año con datos):
+    /health, /years, /charts
+    /states?use_rates=&dropna=                 conteos y tasas por estado (fig1–fig4)
+    /charts/<nombre>?top_n=&use_rates=&dropna=  tabla de una gráfica (ver `tables.chart_tables`)
+    /weapons?top_n=                            armas más comunes con su clase
+    /weapon_classes?top_n=                     incidentes por estado y clase de arma
+    /cohort?gender=&race=&armed=&flee=&threat_level=&age_min=&age_max=&by_race=&dropna=
+    /map?metric=&use_rates=                    vector por estado del mapa
+    /correlations                              covariables vs tasas (ver `stats`)
+"""
+import asyncio
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from . import stats, tables
+from .cohorts import ATTRIBUTES, Cohort, build_cohort_index
+from .dataset import DatasetError
+from .registry import DatasetRegistry
+
+DEFAULT_PORT = 8765
+MAX_HEADER_BYTES = 16 * 1024
+# antigüedad máxima (s) de la versión de datos con la que el loop responde desde caché;
+# pasado esto la petición va al hilo, que vuelve a consultar el registro
+KEY_MAX_AGE = 1.0
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseCache:
+    """LRU de cuerpos JSON ya codificados (bytes), seguro entre hilos; miss = respuesta calculada."""
+
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            body = self._items.get(key)
+            if body is None:
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body: bytes):
+        with self._lock:
+            self.misses += 1
+            self._items[key] = body
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+# ---------- parámetros ----------
+def _one(query: dict, name: str):
+    values = query.get(name)
+    return values[-1] if values else None
+
+
+def _int(query: dict, name: str, default=None, minimum: int | None = None):
+    value = _one(query, name)
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ApiError(400, f"'{name}' debe ser entero, no {value!r}") from None
+    if minimum is not None and number < minimum:
+        raise ApiError(400, f"'{name}' debe ser al menos {minimum}, no {number}")
+    return number
+
+
+def _bool(query: dict, name: str, default: bool) -> bool:
+    value = _one(query, name)
+    if value in (None, ""):
+        return default
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ApiError(400, f"'{name}' debe ser booleano (true/false), no {value!r}")
+
+
+def _list(query: dict, name: str, upper: bool) -> tuple:
+    """Lista separada por comas (o parámetro repetido), normalizada como en `cohorts.ATTRIBUTES`."""
+    items = [v.strip() for raw in query.get(name, []) for v in raw.split(",") if v.strip()]
+    return tuple(v.upper() if upper else v.lower() for v in items)
+
+
+def _records(df: pd.DataFrame | None):
+    if df is None:
+        raise ApiError(404, "Los archivos cargados no traen las columnas para esta tabla.")
+    # to_json resuelve NaN -> null y tipos NumPy/categóricos
+    return json.loads(df.to_json(orient="records", force_ascii=False, date_format="iso"))
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"No serializable: {type(value).__name__}")
+
+
+def _clean(value):
+    """NaN/inf -> None (JSON estricto)."""
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if isinstance(value, list):
+        return [_clean(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _clean(v) for k, v in value.items()}
+    return value
+
+
+class DashboardApi:
+    """Rutas -> datos, independiente del transporte: `handle(target)` devuelve (status, cuerpo, hit)."""
+
+    def __init__(self, registry: DatasetRegistry | None = None, cache: ResponseCache | None = None):
+        self.registry = registry or DatasetRegistry()
+        self.cache = cache or ResponseCache()
+        self._cohort_indexes = {}   # versión de datos -> CohortIndex
+        self._current = None        # (versión de datos, time.monotonic()) de la última consulta al registro
+        self._lock = threading.Lock()
+        self.routes = {
+            "/health": self.health,
+            "/years": self.years,
+            "/states": self.states,
+            "/charts": self.chart_names,
+            "/weapons": self.weapons,
+            "/weapon_classes": self.weapon_classes,
+            "/cohort": self.cohort,
+            "/map": self.state_map,
+            "/correlations": self.correlations,
+        }
+
+    # ---------- estado ----------
+    def dataset(self):
+        """Dataset vigente del registro (puede hashear o construir: llamar fuera del loop)."""
+        try:
+            ds = self.registry.get()
+        except DatasetError as e:
+            raise ApiError(503, str(e)) from None
+        self._current = (ds.key, time.monotonic())
+        return ds
+
+    def cohort_index(self, ds):
+        with self._lock:
+            index = self._cohort_indexes.get(ds.key)
+            if index is None:
+                index = build_cohort_index(ds.pk, ds.date_col, ds.dim)
+                self._cohort_indexes = {ds.key: index}   # solo la versión vigente
+            return index
+
+    @staticmethod
+    def _year(ds, query):
+        year = _int(query, "year", ds.years[0] if ds.years else None)
+        if year not in ds.years:
+            raise ApiError(400, f"Año sin datos: {year}. Disponibles: {ds.years}")
+        return year
+
+    # ---------- rutas ----------
+    def health(self, ds, query):
+        return {"status": "ok", "dataset_key": [list(k) for k in ds.key], "rows": len(ds.pk),
+                "builds": self.registry.builds, "cache": {"entries": len(self.cache), "hits": self.cache.hits,
+                                                          "misses": self.cache.misses}}
+
+    def years(self, ds, query):
+        return ds.years
+
+    def states(self, ds, query):
+        return _records(tables.state_summary(ds, self._year(ds, query), _bool(query, "use_rates", True),
+                                             _bool(query, "dropna", False)))
+
+    def chart_names(self, ds, query):
+        return sorted(tables.chart_tables(ds, ds.years[0], 10))
+
+    def chart(self, ds, query, name):
+        charts = tables.chart_tables(ds, self._year(ds, query), _int(query, "top_n", 10, minimum=1),
+                                     _bool(query, "use_rates", True), _bool(query, "dropna", False))
+        if name not in charts:
+            raise ApiError(404, f"Gráfica desconocida: {name}. Disponibles: {sorted(charts)}")
+        return _records(charts[name])
+
+    def weapons(self, ds, query):
+        df = tables.top_weapons(ds, self._year(ds, query))
+        top_n = _int(query, "top_n", minimum=1)
+        return _records(df if df is None or top_n is None else df.head(top_n))
+
+    def weapon_classes(self, ds, query):
+        return _records(tables.weapon_classes_by_state(ds, self._year(ds, query),
+                                                               _int(query, "top_n", minimum=1)))
+
+    def cohort(self, ds, query):
+        filters = {attr: _list(query, attr, upper) for attr, upper in ATTRIBUTES.items()}
+        cohort = Cohort(_one(query, "label") or "", **filters,
+                        age_min=_int(query, "age_min"), age_max=_int(query, "age_max"))
+        cohort = Cohort(**{**cohort.as_dict(), "label": cohort.label or cohort.describe()})
+        year = None if _one(query, "year") == "all" else self._year(ds, query)
+        return _records(tables.cohort_rates(ds, self.cohort_index(ds), [cohort], year,
+                                            dropna=_bool(query, "dropna", False),
+                                            by_race=_bool(query, "by_race", True)))
+
+    def state_map(self, ds, query):
+        metric = _one(query, "metric") or "total"
+        if metric not in tables.map_metrics(ds) or metric == "cohort":
+            raise ApiError(400, f"Métrica desconocida: {metric!r} (usa /cohort para cohortes)")
+        values = tables.state_vector(ds, metric, self._year(ds, query), _bool(query, "use_rates", True))
+        return {"metric": metric, "states": ds.dim.codes.tolist(), "values": _clean(values.tolist())}
+
+    def correlations(self, ds, query):
+        return _records(stats.correlation_table(ds, self._year(ds, query)))
+
+    # ---------- despacho ----------
+    @staticmethod
+    def _parse(target: str) -> tuple:
+        parts = urlsplit(target)
+        return unquote(parts.path).rstrip("/") or "/", parse_qs(parts.query)
+
+    @staticmethod
+    def _key(version: tuple, path: str, query: dict) -> tuple:
+        return version, path, tuple(sorted((k, tuple(v)) for k, v in query.items()))
+
+    def cached(self, target: str) -> bytes | None:
+        """Cuerpo ya calculado para `target`, o None; no toca el registro (apto para el loop).
+
+        Usa la versión de datos de la última consulta al registro; si es más vieja que
+        `KEY_MAX_AGE` devuelve None y la petición pasa por `handle`, que la renueva.
+        """
+        current = self._current
+        if current is None or time.monotonic() - current[1] > KEY_MAX_AGE:
+            return None
+        path, query = self._parse(target)
+        if path == "/health":
+            return None
+        return self.cache.get(self._key(current[0], path, query))
+
+    def resolve(self, path: str):
+        if path in self.routes:
+            return self.routes[path]
+        if path.startswith("/charts/"):
+            name = path[len("/charts/"):]
+            return lambda ds, query: self.chart(ds, query, name)
+        raise ApiError(404, f"Ruta desconocida: {path}")
+
+    def handle(self, target: str) -> tuple:
+        """(status, cuerpo JSON, hit de caché) para un GET de `target` (ruta + query string)."""
+        try:
+            path, query = self._parse(target)
+            handler = self.resolve(path)
+            ds = self.dataset()
+            key = self._key(ds.key, path, query)
+            if path != "/health":
+                body = self.cache.get(key)
+                if body is not None:
+                    return 200, body, True
+            body = json.dumps(_clean(handler(ds, query)), ensure_ascii=False, default=_json_default,
+                              allow_nan=False).encode("utf-8")
+            if path != "/health":
+                self.cache.put(key, body)
+            return 200, body, False
+        except ApiError as e:
+            return e.status, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8"), False
+        except (ValueError, KeyError) as e:
+            return 400, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8"), False
+
+
+# ---------- transporte HTTP ----------
+def _response(status: int, body: bytes, keep_alive: bool, cache_hit: bool = False) -> bytes:
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"X-Cache: {'hit' if cache_hit else 'miss'}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def _serve_connection(api: DashboardApi, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ", 2)
+            except ValueError:
+                writer.write(_response(400, b'{"error": "petici\\u00f3n mal formada"}', False))
+                break
+            headers = {k.strip().lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+            length = int(headers.get("content-length", 0) or 0)
+            if length:
+                await reader.readexactly(length)   # GET no usa cuerpo; se descarta
+            keep_alive = (headers.get("connection", "").lower() != "close"
+                          and (version == "HTTP/1.1" or headers.get("connection", "").lower() == "keep-alive"))
+            if method != "GET":
+                writer.write(_response(405, b'{"error": "solo GET"}', keep_alive))
+            else:
+                body = api.cached(target)
+                if body is not None:
+                    writer.write(_response(200, body, keep_alive, True))
+                else:
+                    # cálculo nuevo (pandas/NumPy) en un hilo: el loop sigue atendiendo otras conexiones
+                    status, body, hit = await loop.run_in_executor(None, api.handle, target)
+                    writer.write(_response(status, body, keep_alive, hit))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except Exception:
+        traceback.print_exc()
+        try:
+            writer.write(_response(500, b'{"error": "error interno"}', False))
+            await writer.drain()
+        except ConnectionError:
+            pass
+    finally:
+        writer.close()
+
+
+async def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT, api: DashboardApi | None = None,
+                ready: asyncio.Event | None = None):
+    api = api or DashboardApi()
+    # carga en frío antes de aceptar conexiones: la primera petición ya encuentra el dataset en memoria
+    await asyncio.get_running_loop().run_in_executor(None, api.dataset)
+    server = await asyncio.start_server(lambda r, w: _serve_connection(api, r, w), host, port,
+                                        limit=MAX_HEADER_BYTES)
+    print(f"API en http://{host}:{port} (Ctrl+C para salir)", flush=True)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,180 @@
+# analytics/citymatch.py
+"""Índice de ciudades: (estado, ciudad) de PoliceKillingsUS4 -> fila de la tabla ACS.
+
+Los nombres del Census traen sufijos ("Abbeville city", "Abanda CDP",
+"Nashville-Davidson metropolitan government (balance)") y los incidentes no
+("Shelton"). Cada nombre se normaliza a una llave (minúsculas, sin
+puntuación, "Saint" = "St"; en ACS además sin sufijo) y cada fila ACS aporta
+alias ("San Buenaventura (Ventura) city" -> "san buenaventura" y "ventura").
+Lo que no calza exacto se busca con `difflib` entre las ciudades del mismo
+estado que empiezan con la misma letra.
+
+El emparejamiento corre una vez por versión de datos y se guarda en Feather
+junto a la caché de ingesta; después cada búsqueda es un acceso a diccionario.
+"""
+import difflib
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from .acs import CityTable
+from .ingest import cache_path, content_hash
+
+# sufijos del Census, del más largo al más corto
+SUFFIXES = (
+    "city and borough", "metropolitan government", "metro government", "unified government",
+    "consolidated government", "urban county", "municipality", "corporation", "borough",
+    "village", "city", "town", "cdp",
+)
+TOKEN_ALIASES = {"saint": "st", "sainte": "ste", "fort": "ft", "mount": "mt"}
+FUZZY_CUTOFF = 0.9
+MATCH_VERSION = 1   # subir si cambia la normalización: invalida los índices guardados
+
+_SUFFIX_RE = re.compile(r"\s+(?:" + "|".join(SUFFIXES) + r")$")
+_COUNTY_RE = re.compile(r"\s*\([^)]*count(?:y|ies)\)")   # "(Coosa County)" desambigua, no es alias
+_PAREN_RE = re.compile(r"\s*\(([^)]*)\)")
+
+
+def _clean(text: str) -> str:
+    text = re.sub(r"[^a-z0-9 ]+", " ", text.replace("'", ""))
+    return " ".join(TOKEN_ALIASES.get(t, t) for t in text.split())
+
+
+@lru_cache(maxsize=None)
+def city_key(name, census=False) -> str:
+    """Llave normalizada de un nombre de ciudad; con `census` se quita el sufijo ("city", "CDP"…)."""
+    if not isinstance(name, str):
+        return ""
+    text = name.strip().lower().replace("(balance)", "")
+    text = _PAREN_RE.sub("", _COUNTY_RE.sub("", text)).strip()
+    return _clean(_SUFFIX_RE.sub("", text) if census else text)
+
+
+@lru_cache(maxsize=None)
+def city_aliases(name) -> tuple:
+    """Llave principal + alias de un nombre ACS (partes con guion o '/', nombre entre paréntesis)."""
+    key = city_key(name, census=True)
+    if not key:
+        return ()
+    text = _COUNTY_RE.sub("", name.strip().lower().replace("(balance)", ""))
+    aliases = [key]
+    for inner in _PAREN_RE.findall(text):
+        aliases.append(_clean(inner))
+    base = _SUFFIX_RE.sub("", _PAREN_RE.sub("", text).strip())
+    for part in re.split(r"[-/]", base):
+        aliases.append(_clean(_SUFFIX_RE.sub("", part.strip())))
+    # sufijo doble: "Boise City city" -> "boise", "Weymouth Town city" -> "weymouth"
+    aliases.append(_SUFFIX_RE.sub("", key))
+    return tuple(dict.fromkeys(a for a in aliases if a))
+
+
+@dataclass(frozen=True)
+class CityIndex:
+    """(state_id, ciudad del incidente) -> fila de `CityTable` (-1 = sin pareja)."""
+    rows: dict       # (state_id, ciudad) -> fila
+    methods: dict    # (state_id, ciudad) -> "exact" | "alias" | "fuzzy"
+
+    def lookup(self, state_id, city) -> int:
+        return self.rows.get((int(state_id), city), -1)
+
+    def lookup_many(self, state_ids, cities) -> np.ndarray:
+        return np.array([self.rows.get((int(s), c), -1) for s, c in zip(state_ids, cities)], dtype=np.intp)
+
+    def extend(self, pairs, table: CityTable) -> "CityIndex":
+        """Índice con los pares nuevos emparejados; los ya conocidos no se vuelven a buscar."""
+        new = [p for p in pairs if p not in self.rows]
+        if not new:
+            return self
+        added = match_cities(new, table)
+        return CityIndex(rows={**self.rows, **added.rows}, methods={**self.methods, **added.methods})
+
+    @property
+    def summary(self) -> dict:
+        """Cuántas ciudades de incidentes calzaron por cada método."""
+        return pd.Series(list(self.methods.values()), dtype=object).value_counts().to_dict()
+
+    def frame(self) -> pd.DataFrame:
+        keys = list(self.rows)
+        return pd.DataFrame({"state_id": np.array([k[0] for k in keys], dtype=np.int64),
+                             "city": [k[1] for k in keys],
+                             "row": np.array(list(self.rows.values()), dtype=np.int64),
+                             "method": [self.methods[k] for k in keys]})
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "CityIndex":
+        keys = list(zip(df["state_id"].tolist(), df["city"].tolist()))
+        return cls(rows=dict(zip(keys, df["row"].tolist())), methods=dict(zip(keys, df["method"].tolist())))
+
+
+def _acs_keys(table: CityTable):
+    """state_id -> {llave: fila}; la llave principal de una fila gana sobre alias de otra."""
+    exact, alias = {}, {}
+    for row, (s, name) in enumerate(zip(table.state_id.tolist(), table.city.tolist())):
+        keys = city_aliases(name)
+        if not keys:
+            continue
+        exact.setdefault(s, {}).setdefault(keys[0], row)
+        for k in keys[1:]:
+            alias.setdefault(s, {}).setdefault(k, row)
+    return exact, alias
+
+
+def match_cities(pairs, table: CityTable, cutoff: float = FUZZY_CUTOFF) -> CityIndex:
+    """Empareja pares (state_id, ciudad) distintos: llave exacta, alias y luego difflib por estado."""
+    exact, alias = _acs_keys(table)
+    by_initial = {}   # (state_id, primera letra) -> llaves candidatas para difflib
+    for s, keys in exact.items():
+        for k in keys:
+            by_initial.setdefault((s, k[0]), []).append(k)
+    rows, methods = {}, {}
+    for s, city in pairs:
+        key = city_key(city)
+        if not key or s < 0:
+            continue
+        in_state, aliases = exact.get(s, {}), alias.get(s, {})
+        if key in in_state:
+            rows[(s, city)], methods[(s, city)] = in_state[key], "exact"
+        elif key in aliases:
+            rows[(s, city)], methods[(s, city)] = aliases[key], "alias"
+        else:
+            close = difflib.get_close_matches(key, by_initial.get((s, key[0]), ()), n=1, cutoff=cutoff)
+            if close:
+                rows[(s, city)], methods[(s, city)] = in_state[close[0]], "fuzzy"
+    return CityIndex(rows=rows, methods=methods)
+
+
+def incident_pairs(pk: pd.DataFrame, city_col: str = "city") -> list:
+    """Pares (state_id, ciudad) distintos de los incidentes."""
+    if city_col not in pk.columns:
+        return []
+    pairs = pk[["state_id", city_col]].dropna().drop_duplicates()
+    return list(zip(pairs["state_id"].astype(int).tolist(), pairs[city_col].astype(str).tolist()))
+
+
+def load_city_index(pairs, table: CityTable, key) -> CityIndex:
+    """Índice guardado en Feather para `key` (versión de datos); si no existe se empareja y se guarda.
+
+    Sin `key` (datos armados a mano) no hay versión con qué nombrar el archivo: solo se empareja.
+    """
+    if not key:
+        return match_cities(pairs, table)
+    path = cache_path(f"cityindex-{content_hash(repr((MATCH_VERSION, key)).encode())}")
+    if path.exists():
+        try:
+            return CityIndex.from_frame(feather.read_table(path).to_pandas())
+        except Exception:
+            path.unlink(missing_ok=True)
+    index = match_cities(pairs, table)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        feather.write_feather(index.frame(), tmp, compression="uncompressed")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return index
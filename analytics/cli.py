@@ -0,0 +1,101 @@
+# analytics/cli.py
+"""Exporta en lote las tablas de todas las gráficas, sin levantar Streamlit.
+
+    python -m analytics export --data-dir . --out exports --format parquet
+    python -m analytics serve --port 8765
+
+Estructura de salida: <out>/<año>/top<N>/<rates|counts>/<gráfica>.<ext> y un
+manifest.json con la versión de los datos. `serve` levanta la API JSON (ver `api`).
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+from .api import DEFAULT_PORT, ApiError, DashboardApi, serve
+from .dataset import DATA_DIR, DatasetError, append_incidents, load_dir
+from .ingest import content_hash, load_csv
+from .registry import DatasetRegistry
+from .tables import chart_tables
+
+FORMATS = ("csv", "parquet", "json")
+
+
+def write_table(df, path: Path, fmt: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+    elif fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_json(path, orient="records", force_ascii=False)
+
+
+def export(data_dir, out_dir, fmt="csv", top_ns=range(5, 21), years=None, dropna=False, updates=()) -> int:
+    ds = load_dir(data_dir)
+    for path in updates:
+        data = Path(path).read_bytes()
+        ds = append_incidents(ds, load_csv(data, "pk"), content_hash(data))
+    out_dir = Path(out_dir)
+    written = 0
+    for year in years or ds.years:
+        for top_n in top_ns:
+            for use_rates in (True, False):
+                mode = "rates" if use_rates else "counts"
+                for name, df in chart_tables(ds, year, top_n, use_rates, dropna).items():
+                    write_table(df, out_dir / str(year) / f"top{top_n}" / mode / f"{name}.{fmt}", fmt)
+                    written += 1
+    manifest = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dataset_key": [list(k) for k in ds.key],
+        "years": list(years or ds.years),
+        "top_n": list(top_ns),
+        "format": fmt,
+        "tables": written,
+    }
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return written
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m analytics",
+                                     description="Cálculo en lote de las tablas del dashboard.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("export", help="escribe la tabla de cada gráfica por año y top N")
+    p.add_argument("--data-dir", default=str(DATA_DIR), help="directorio con los CSV (default: raíz del repo)")
+    p.add_argument("--out", default="exports", help="directorio de salida")
+    p.add_argument("--format", choices=FORMATS, default="csv")
+    p.add_argument("--top-n", type=int, nargs="+", default=list(range(5, 21)))
+    p.add_argument("--years", type=int, nargs="+", default=None)
+    p.add_argument("--dropna", action="store_true",
+                   help="descarta estados sin población al calcular tasas (comportamiento de app2.py)")
+    p.add_argument("--updates", nargs="+", default=[],
+                   help="CSV con incidentes nuevos o corregidos (por 'id'), aplicados en orden")
+
+    p = sub.add_parser("serve", help="API HTTP/JSON con los agregados del dashboard")
+    p.add_argument("--data-dir", default=None, help="directorio con los CSV (default: DASHBOARD_DATA_DIR o raíz)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        api = DashboardApi(DatasetRegistry(args.data_dir) if args.data_dir else None)
+        try:
+            asyncio.run(serve(args.host, args.port, api))
+        except KeyboardInterrupt:
+            pass
+        except ApiError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        return 0
+    try:
+        t0 = time.perf_counter()
+        n = export(args.data_dir, args.out, args.format, args.top_n, args.years, args.dropna, args.updates)
+    except DatasetError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{n} tablas escritas en {args.out} ({time.perf_counter() - t0:.1f}s)")
+    return 0
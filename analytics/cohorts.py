@@ -0,0 +1,126 @@
+# analytics/cohorts.py
+"""Cohortes demográficas arbitrarias sobre índices de bits por valor de atributo.
+
+Las filas de `pk` se ordenan una vez por (año, estado) y por cada valor de
+género, raza, arma, huida y amenaza se guarda un bitmap empacado (1 bit por
+fila). Una cohorte es un AND de ORs de bitmaps; el conteo por (año, estado) sale
+de una suma acumulada sobre los bits con los bordes de cada celda.
+"""
+from dataclasses import dataclass, fields
+
+import numpy as np
+import pandas as pd
+
+from .cube import MAX_AGE, _age_buckets, _factorize, _rows
+from .states import StateDim
+
+# atributo -> etiquetas en mayúsculas (códigos) o minúsculas (texto libre)
+ATTRIBUTES = {
+    "gender": True,
+    "race": True,
+    "armed": False,
+    "flee": False,
+    "threat_level": False,
+}
+
+
+@dataclass(frozen=True)
+class Cohort:
+    """Filtro por atributo; una tupla vacía o una edad None significa 'sin filtro'."""
+    label: str
+    gender: tuple = ()
+    race: tuple = ()
+    armed: tuple = ()
+    flee: tuple = ()
+    threat_level: tuple = ()
+    age_min: int | None = None
+    age_max: int | None = None
+
+    def as_dict(self) -> dict:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    def describe(self, race_names: dict | None = None) -> str:
+        """Etiqueta corta a partir de los filtros (ej. 'M · White · 25–40')."""
+        names = race_names or {}
+        parts = ["/".join(self.gender), "/".join(names.get(r, r) for r in self.race),
+                 "/".join(self.armed), "/".join(self.flee), "/".join(self.threat_level)]
+        if self.age_min is not None or self.age_max is not None:
+            parts.append(f"{self.age_min or 0}–{MAX_AGE if self.age_max is None else self.age_max}")
+        return " · ".join(p for p in parts if p) or "Todos"
+
+
+def race_names(races: pd.DataFrame | None) -> dict:
+    """Código de raza -> nombre, desde Races.csv (vacío si no se subió)."""
+    if races is None or not {"race_id", "race"} <= set(races.columns):
+        return {}
+    return dict(zip(races["race_id"].astype(str), races["race"].astype(str)))
+
+
+@dataclass(frozen=True)
+class CohortIndex:
+    years: np.ndarray       # (Y,)
+    n_states: int
+    bounds: np.ndarray      # (Y * S + 1,) inicio de cada celda (año, estado) en el orden de filas
+    labels: dict            # atributo -> (V,) etiquetas
+    bitmaps: dict           # atributo -> (V, ceil(N / 8)) uint8, bits empacados por valor
+    age: np.ndarray         # (N,) edad en años; MAX_AGE + 1 = desconocida
+    n_rows: int
+
+    def options(self, attr) -> list:
+        return list(self.labels.get(attr, []))
+
+    def mask(self, cohort: Cohort) -> np.ndarray:
+        """Bits empacados de las filas que cumplen la cohorte."""
+        bits = np.full((self.n_rows + 7) // 8, 0xFF, dtype=np.uint8)
+        for attr in ATTRIBUTES:
+            chosen = getattr(cohort, attr)
+            if not chosen:
+                continue
+            if attr not in self.labels:
+                return np.zeros_like(bits)
+            idx = np.flatnonzero(np.isin(self.labels[attr], np.asarray(chosen, dtype=object)))
+            if not len(idx):
+                return np.zeros_like(bits)
+            bits &= np.bitwise_or.reduce(self.bitmaps[attr][idx], axis=0)
+        if cohort.age_min is not None or cohort.age_max is not None:
+            lo = 0 if cohort.age_min is None else max(int(cohort.age_min), 0)
+            hi = MAX_AGE if cohort.age_max is None else min(int(cohort.age_max), MAX_AGE)
+            bits &= np.packbits((self.age >= lo) & (self.age <= hi))
+        return bits
+
+    def counts(self, cohort: Cohort) -> np.ndarray:
+        """(Y, S) incidentes de la cohorte por año y estado."""
+        hit = np.unpackbits(self.mask(cohort), count=self.n_rows)
+        cum = np.concatenate([[0], np.cumsum(hit, dtype=np.int64)])
+        return (cum[self.bounds[1:]] - cum[self.bounds[:-1]]).reshape(len(self.years), self.n_states)
+
+    def state_counts(self, cohort: Cohort, year=None) -> np.ndarray:
+        """(S,) incidentes por estado en `year` (None = todos los años)."""
+        counts = self.counts(cohort)
+        if year is None:
+            return counts.sum(axis=0)
+        y = np.flatnonzero(self.years == year)
+        return counts[y[0]] if len(y) else np.zeros(self.n_states, dtype=np.int64)
+
+
+def build_cohort_index(pk: pd.DataFrame, date_col: str, dim: StateDim) -> CohortIndex:
+    """Ordena filas por (año, estado) y empaca un bitmap por valor de cada atributo; requiere `state_id`."""
+    valid, year_values, s_codes = _rows(pk, date_col)
+    df = pk.loc[valid]
+    S = len(dim)
+    years = np.unique(year_values)
+    cell = np.searchsorted(years, year_values) * S + s_codes
+    order = np.argsort(cell, kind="stable")
+    bounds = np.searchsorted(cell[order], np.arange(len(years) * S + 1))
+
+    labels, bitmaps = {}, {}
+    for attr, upper in ATTRIBUTES.items():
+        if attr not in df.columns:
+            continue
+        codes, attr_labels = _factorize(df[attr], upper=upper)
+        codes = codes[order]
+        labels[attr] = attr_labels
+        bitmaps[attr] = np.stack([np.packbits(codes == v) for v in range(len(attr_labels))])
+    age = _age_buckets(df["age"])[order] if "age" in df.columns else np.full(len(df), MAX_AGE + 1)
+    return CohortIndex(years=years, n_states=S, bounds=bounds, labels=labels, bitmaps=bitmaps,
+                       age=age, n_rows=len(df))
@@ -0,0 +1,317 @@
+# analytics/cube.py
+"""Cubo estatal: conteos por (año, estado) precalculados una vez por versión de datos.
+
+Todas las gráficas por estado salen de rebanar estos arreglos (O(estados)),
+así que mover un slider o cambiar a tasas no vuelve a recorrer `pk`.
+`StateCube.update` aplica un lote de filas nuevas/cambiadas tocando solo las
+celdas (año, estado) afectadas.
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from .states import StateDim
+from .weapons import WEAPON_CLASSES, class_codes, class_matrix, includes_matrix
+
+MAX_AGE = 100          # edades > MAX_AGE se acumulan en el último bucket de edad real
+UNKNOWN = "unknown"    # etiqueta para valores faltantes en cualquier dimensión
+CITY_BITS = 32         # llave de ciudad: ((año * S + estado) << CITY_BITS) | ciudad
+
+
+def _factorize(values: pd.Series, upper: bool = False):
+    """Códigos enteros + etiquetas; los faltantes/vacíos se vuelven `UNKNOWN`.
+
+    El texto se normaliza sobre las categorías (ya vienen limpias del esquema)
+    y los códigos de fila solo se reindexan.
+    """
+    cat = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype("category")
+    names = pd.Series(cat.cat.categories.astype(str)).str.strip()
+    names = names.str.upper() if upper else names.str.lower()
+    names = names.replace({"": UNKNOWN, "NAN": UNKNOWN, "nan": UNKNOWN})
+    codes = cat.cat.codes.to_numpy()
+    if (codes < 0).any():
+        names = pd.concat([names, pd.Series([UNKNOWN])], ignore_index=True)
+    remap, labels = pd.factorize(names, sort=True)
+    # código -1 (faltante) toma el último elemento de `remap`, que es UNKNOWN
+    return remap[codes].astype(np.intp), np.asarray(labels, dtype=object)
+
+
+def _age_buckets(age: pd.Series) -> np.ndarray:
+    """Edad en años enteros (0..MAX_AGE); la edad desconocida va en el bucket MAX_AGE + 1."""
+    a = pd.to_numeric(age, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    out = np.full(len(a), MAX_AGE + 1, dtype=np.intp)
+    ok = ~np.isnan(a)
+    out[ok] = np.clip(a[ok], 0, MAX_AGE).astype(np.intp)
+    return out
+
+
+def _count(shape, *codes) -> np.ndarray:
+    """Histograma denso sobre varias dimensiones con un solo bincount."""
+    flat = np.ravel_multi_index(codes, shape)
+    return np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+
+def _rows(df: pd.DataFrame, date_col: str):
+    """Filas que entran al cubo: (máscara, año, state_id de las filas válidas)."""
+    ids = df["state_id"].to_numpy()
+    year = df[date_col].dt.year
+    valid = year.notna().to_numpy() & (ids >= 0)
+    return valid, year[valid].to_numpy(dtype=np.int64), ids[valid].astype(np.intp)
+
+
+def _city_keys(year_values, s_codes, c_codes, n_states) -> np.ndarray:
+    return ((year_values.astype(np.int64) * n_states + s_codes) << CITY_BITS) | c_codes
+
+
+def _cities(city_keys, years, n_states) -> np.ndarray:
+    """Ciudades distintas por (año, estado) a partir de las llaves únicas."""
+    cells = city_keys >> CITY_BITS
+    return _count((len(years), n_states), np.searchsorted(years, cells // n_states), cells % n_states)
+
+
+def _grow(labels, new_labels, axis, *arrays):
+    """Une etiquetas (ordenadas) y abre rebanadas en cero en `axis` para las nuevas."""
+    merged = np.union1d(labels, new_labels)
+    if len(merged) == len(labels):
+        return labels, list(arrays)
+    index = [slice(None)] * arrays[0].ndim
+    index[axis] = np.searchsorted(merged, labels)
+    grown = []
+    for arr in arrays:
+        shape = list(arr.shape)
+        shape[axis] = len(merged)
+        out = np.zeros(shape, dtype=arr.dtype)
+        out[tuple(index)] = arr
+        grown.append(out)
+    return merged, grown
+
+
+def _merge_counts(keys, counts, new_keys, deltas):
+    """Suma `deltas` a un conteo por llave ordenada; las llaves en cero desaparecen."""
+    pos = np.searchsorted(keys, new_keys)
+    hit = pos < len(keys)
+    hit[hit] = keys[pos[hit]] == new_keys[hit]
+    counts = counts.copy()
+    counts[pos[hit]] += deltas[hit]
+    keys = np.insert(keys, pos[~hit], new_keys[~hit])
+    counts = np.insert(counts, pos[~hit], deltas[~hit])
+    keep = counts > 0
+    return keys[keep], counts[keep]
+
+
+@dataclass(frozen=True)
+class StateCube:
+    years: np.ndarray           # (Y,)
+    states: np.ndarray          # (S,) código de estado, alineado con `StateDim` (índice = state_id)
+    total: np.ndarray           # (Y, S) incidentes
+    mental: np.ndarray          # (Y, S) con signs_of_mental_illness
+    cities: np.ndarray          # (Y, S) ciudades distintas
+    armed_labels: np.ndarray    # (A,)
+    armed: np.ndarray           # (Y, S, A)
+    gender_labels: np.ndarray   # (G,)
+    race_labels: np.ndarray     # (R,)
+    demo: np.ndarray            # (Y, S, G, R, MAX_AGE + 2)
+    city_labels: np.ndarray | None = None   # (C,) vocabulario de ciudades; None sin columna de ciudad
+    city_keys: np.ndarray | None = None     # (K,) llaves (año, estado, ciudad) ordenadas
+    city_counts: np.ndarray | None = None   # (K,) incidentes por llave
+
+    # ---------- rebanadas ----------
+    def _year(self, year) -> int:
+        idx = np.flatnonzero(self.years == year)
+        if not len(idx):
+            raise KeyError(f"Año sin datos en el cubo: {year}")
+        return int(idx[0])
+
+    def _frame(self, values: np.ndarray, state_col: str, value_col: str) -> pd.DataFrame:
+        """Solo estados con conteo > 0, igual que un groupby sobre las filas."""
+        keep = np.flatnonzero(values > 0)
+        return pd.DataFrame({state_col: self.states[keep], "state_id": keep, value_col: values[keep]})
+
+    def state_values(self, metric: str, year) -> np.ndarray:
+        """(S,) conteo denso por estado; metric: 'total', 'mental', 'cities' o una clase de arma ('toy'…).
+
+        Una clase de arma cuenta los incidentes que la incluyen ("gun and toy" cuenta en 'toy'
+        y en 'firearm'), como el filtro por palabra original; `class_counts` reparte sin repetir.
+        """
+        y = self._year(year)
+        if metric in WEAPON_CLASSES:
+            return self.armed[y][:, self.includes(metric)].sum(axis=1)
+        return getattr(self, metric)[y]
+
+    def state_counts(self, metric: str, year, state_col="state", value_col="count") -> pd.DataFrame:
+        """Igual que `state_values`, como tabla de estados con conteo > 0."""
+        return self._frame(self.state_values(metric, year), state_col, value_col)
+
+    def armed_counts(self, year) -> pd.DataFrame:
+        """Conteo por arma (etiqueta normalizada) ordenado de mayor a menor."""
+        values = self.armed[self._year(year)].sum(axis=0)
+        out = pd.DataFrame({"weapon": self.armed_labels, "count": values,
+                            "weapon_class": np.asarray(WEAPON_CLASSES, dtype=object)[self.weapon_class]})
+        return out[out["count"] > 0].sort_values("count", ascending=False, ignore_index=True)
+
+    def class_counts(self, year, state_col="state") -> pd.DataFrame:
+        """Incidentes por (estado, clase de arma), en formato largo; solo celdas > 0."""
+        values = self.armed[self._year(year)] @ class_matrix(self.armed_labels)   # (S, K)
+        s, k = np.nonzero(values)
+        return pd.DataFrame({state_col: self.states[s], "state_id": s,
+                             "weapon_class": np.asarray(WEAPON_CLASSES, dtype=object)[k],
+                             "count": values[s, k]})
+
+    def demo_counts(self, year, gender, race, age_min, age_max,
+                    state_col="state", value_col="count") -> pd.DataFrame:
+        """Incidentes por estado para un perfil género × raza × rango de edad (inclusive)."""
+        y = self._year(year)
+        g = np.flatnonzero(self.gender_labels == str(gender).upper())
+        r = np.flatnonzero(self.race_labels == str(race).upper())
+        if not len(g) or not len(r):
+            return self._frame(np.zeros(len(self.states), dtype=np.int64), state_col, value_col)
+        lo, hi = max(int(age_min), 0), min(int(age_max), MAX_AGE)
+        values = self.demo[y, :, g[0], r[0], lo:hi + 1].sum(axis=-1)
+        return self._frame(values, state_col, value_col)
+
+    def city_counts_in(self, year, state_id):
+        """(ciudades, incidentes) de un estado en `year`: un rango contiguo de las llaves ordenadas."""
+        if self.city_keys is None:
+            return np.array([], dtype=object), np.array([], dtype=np.int64)
+        cell = int(self.years[self._year(year)]) * len(self.states) + int(state_id)
+        lo, hi = np.searchsorted(self.city_keys, [cell << CITY_BITS, (cell + 1) << CITY_BITS])
+        codes = self.city_keys[lo:hi] & ((1 << CITY_BITS) - 1)
+        return self.city_labels[codes], self.city_counts[lo:hi]
+
+    @property
+    def weapon_class(self) -> np.ndarray:
+        """(A,) clase de cada etiqueta de arma (memorizada por texto en `weapons.classify`)."""
+        return class_codes(self.armed_labels)
+
+    def includes(self, cls: str) -> np.ndarray:
+        """(A,) etiquetas de arma con alguna parte de la clase `cls` (se evalúa sobre etiquetas, no filas)."""
+        return includes_matrix(self.armed_labels)[:, WEAPON_CLASSES.index(cls)].astype(bool)
+
+    @property
+    def toy_mask(self) -> np.ndarray:
+        """Armas que incluyen un juguete/réplica ("toy weapon", "gun and toy"…)."""
+        return self.includes("toy")
+
+    # ---------- actualización incremental ----------
+    def update(self, added: pd.DataFrame, removed: pd.DataFrame, date_col: str,
+               city_col: str | None = "city") -> "StateCube":
+        """Cubo nuevo con `added` sumado y `removed` restado (ambos con 'state_id').
+
+        Costo proporcional al lote: los conteos se ajustan con `np.add.at` y solo
+        se recalculan las ciudades distintas de las celdas tocadas. Etiquetas
+        nuevas (año, arma, género, raza) abren rebanadas en cero en su posición
+        ordenada, igual que una reconstrucción completa. El cubo original no cambia.
+        """
+        df = pd.concat([added, removed], ignore_index=True)
+        sign = np.concatenate([np.ones(len(added), np.int64), np.full(len(removed), -1, np.int64)])
+        valid, yv, s = _rows(df, date_col)
+        df, sign = df.loc[valid], sign[valid]
+        S = len(self.states)
+
+        years, (total, mental, cities, armed, demo) = _grow(
+            self.years, yv, 0, self.total.copy(), self.mental.copy(), self.cities.copy(),
+            self.armed.copy(), self.demo.copy())
+        y = np.searchsorted(years, yv)
+
+        np.add.at(total, (y, s), sign)
+        if "signs_of_mental_illness" in df.columns:
+            m = df["signs_of_mental_illness"].fillna(False).to_numpy(dtype=bool)
+            np.add.at(mental, (y[m], s[m]), sign[m])
+
+        if "armed" in df.columns:
+            a_codes, a_labels = _factorize(df["armed"])
+        else:
+            a_codes, a_labels = np.zeros(len(df), dtype=np.intp), np.array([UNKNOWN], dtype=object)
+        armed_labels, (armed,) = _grow(self.armed_labels, a_labels, 2, armed)
+        np.add.at(armed, (y, s, np.searchsorted(armed_labels, a_labels)[a_codes]), sign)
+
+        gender_labels, race_labels = self.gender_labels, self.race_labels
+        if demo.shape[2] and all(c in df.columns for c in ("gender", "race", "age")):
+            g_codes, g_labels = _factorize(df["gender"], upper=True)
+            r_codes, r_labels = _factorize(df["race"], upper=True)
+            gender_labels, (demo,) = _grow(gender_labels, g_labels, 2, demo)
+            race_labels, (demo,) = _grow(race_labels, r_labels, 3, demo)
+            np.add.at(demo, (y, s, np.searchsorted(gender_labels, g_labels)[g_codes],
+                             np.searchsorted(race_labels, r_labels)[r_codes], _age_buckets(df["age"])), sign)
+
+        city_labels, city_keys, city_counts = self.city_labels, self.city_keys, self.city_counts
+        if city_labels is None or city_col not in df.columns:
+            cities = total.copy()
+        else:
+            c_codes, c_uniq = pd.factorize(df[city_col])
+            c_uniq = np.asarray(c_uniq, dtype=object)
+            idx = pd.Index(city_labels).get_indexer(c_uniq)
+            new = idx < 0
+            idx[new] = len(city_labels) + np.arange(new.sum())
+            city_labels = np.concatenate([city_labels, c_uniq[new]])
+            ok = c_codes >= 0
+            keys, inv = np.unique(_city_keys(yv[ok], s[ok], idx[c_codes[ok]], S), return_inverse=True)
+            deltas = np.bincount(inv, weights=sign[ok]).astype(np.int64)
+            city_keys, city_counts = _merge_counts(city_keys, city_counts, keys, deltas)
+            cells = np.unique(keys >> CITY_BITS)
+            n = (np.searchsorted(city_keys, (cells + 1) << CITY_BITS)
+                 - np.searchsorted(city_keys, cells << CITY_BITS))
+            cities[np.searchsorted(years, cells // S), cells % S] = n
+
+        return replace(self, years=years, total=total, mental=mental, cities=cities,
+                       armed_labels=armed_labels, armed=armed, gender_labels=gender_labels,
+                       race_labels=race_labels, demo=demo, city_labels=city_labels,
+                       city_keys=city_keys, city_counts=city_counts)
+
+
+def build_state_cube(pk: pd.DataFrame, date_col: str, dim: StateDim, state_col: str = "state",
+                     city_col: str | None = "city") -> StateCube:
+    """Recorre `pk` una sola vez y materializa todos los conteos por (año, estado).
+
+    Usa `pk['state_id']` si ya viene codificado; filas con estado fuera de la
+    dimensión (sin población) no entran al cubo.
+    """
+    if "state_id" not in pk.columns:
+        pk = pk.assign(state_id=dim.encode(pk[state_col]))
+    valid, year_values, s_codes = _rows(pk, date_col)
+    df = pk.loc[valid]
+    years = np.unique(year_values)
+    y_codes = np.searchsorted(years, year_values)
+    Y, S = len(years), len(dim)
+
+    total = _count((Y, S), y_codes, s_codes)
+
+    if "signs_of_mental_illness" in df.columns:
+        m = df["signs_of_mental_illness"].fillna(False).to_numpy(dtype=bool)
+        mental = _count((Y, S), y_codes[m], s_codes[m])
+    else:
+        mental = np.zeros((Y, S), dtype=np.int64)
+
+    if city_col is not None and city_col in df.columns:
+        c_codes, city_labels = pd.factorize(df[city_col])
+        city_labels = np.asarray(city_labels, dtype=object)
+        ok = c_codes >= 0
+        city_keys, city_counts = np.unique(_city_keys(year_values[ok], s_codes[ok], c_codes[ok], S),
+                                           return_counts=True)
+        cities = _cities(city_keys, years, S)
+    else:
+        cities = total.copy()  # sin columna de ciudad: conteo por estado
+        city_labels = city_keys = city_counts = None
+
+    if "armed" in df.columns:
+        a_codes, armed_labels = _factorize(df["armed"])
+    else:
+        a_codes, armed_labels = np.zeros(len(df), dtype=np.intp), np.array([UNKNOWN], dtype=object)
+    armed = _count((Y, S, len(armed_labels)), y_codes, s_codes, a_codes)
+
+    if all(c in df.columns for c in ("gender", "race", "age")):
+        g_codes, gender_labels = _factorize(df["gender"], upper=True)
+        r_codes, race_labels = _factorize(df["race"], upper=True)
+        ages = _age_buckets(df["age"])
+        demo = _count((Y, S, len(gender_labels), len(race_labels), MAX_AGE + 2),
+                      y_codes, s_codes, g_codes, r_codes, ages)
+    else:
+        gender_labels = race_labels = np.array([], dtype=object)
+        demo = np.zeros((Y, S, 0, 0, MAX_AGE + 2), dtype=np.int64)
+
+    return StateCube(years=years, states=dim.codes,
+                     total=total, mental=mental, cities=cities,
+                     armed_labels=armed_labels, armed=armed,
+                     gender_labels=gender_labels, race_labels=race_labels, demo=demo,
+                     city_labels=city_labels, city_keys=city_keys, city_counts=city_counts)
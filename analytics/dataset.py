@@ -0,0 +1,234 @@
+# analytics/dataset.py
+"""Carga y preparación completa de los datasets, sin Streamlit.
+
+`build_dataset` recibe los DataFrames ya leídos (subidas o archivos del repo),
+detecta columnas clave, codifica estados y construye cubo + métricas estatales.
+Lo usan igual el dashboard, la CLI y cualquier script. `append_incidents`
+agrega un lote de incidentes nuevos o corregidos (por 'id') sin reconstruir.
+Los CSV por ciudad muy grandes pueden pasarse como `streams` (rutas): se agregan
+por bloques directo al rollup estatal (ver `stream`).
+"""
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .acs import CityTable, RacePopulation, build_city_table, build_race_population, state_rollup
+from .citymatch import CityIndex, incident_pairs, load_city_index
+from .cube import StateCube, build_state_cube
+from .ingest import content_hash, file_hash, load_many
+from .schema import INCIDENT_SCHEMA, apply_schema
+from .states import StateDim, build_state_dim
+from .stream import STREAM_THRESHOLD, load_streamed_metrics, should_stream
+from .timeseries import DailySeries, build_daily_series
+
+# Archivo lógico -> nombre del CSV incluido en el repo
+BUNDLED_FILES = {
+    "pk": "PoliceKillingsUS4.csv",
+    "pop": "population2015.csv",
+    "income": "MedianHouseholdIncome2015.csv",
+    "race_share": "ShareRaceByCity2.csv",
+    "races": "Races.csv",
+    "poverty": "PercentagePeopleBelowPovertyLevel.csv",
+    "hs": "PercentOver25CompletedHighSchool.csv",
+}
+CITY_SOURCES = ("income", "race_share", "poverty", "hs")
+
+DATE_COLS = ("new_date", "date", "incident_date")
+STATE_KEY_COLS = ("geographic_area", "state", "state_name")
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+
+
+class DatasetError(ValueError):
+    """Faltan archivos o columnas mínimas; el mensaje está pensado para el usuario."""
+
+
+@dataclass(frozen=True)
+class Dataset:
+    pk: pd.DataFrame                     # incidentes con fecha parseada y 'state_id'
+    dim: StateDim
+    cube: StateCube
+    series: DailySeries                  # conteos diarios acumulados (rangos de fechas libres)
+    state_metrics: pd.DataFrame | None   # rollup estatal de los archivos por ciudad
+    race_population: RacePopulation | None  # denominadores estado × raza (ShareRaceByCity2)
+    races: pd.DataFrame | None
+    date_col: str
+    state_col: str
+    city_col: str | None
+    key: tuple = ()                      # versión de los datos (hash por archivo)
+    city_table: CityTable | None = None  # métricas ACS por (estado, ciudad), ~29k filas
+    city_index: CityIndex | None = None  # (estado, ciudad del incidente) -> fila de `city_table`
+
+    @property
+    def years(self) -> list:
+        return [int(y) for y in self.cube.years]
+
+    def has_metric(self, col) -> bool:
+        return (self.state_metrics is not None and col in self.state_metrics.columns
+                and self.state_metrics[col].notna().any())
+
+    def metric_by_state(self, df: pd.DataFrame, col) -> np.ndarray:
+        """Une una métrica estatal a una tabla de conteos por índice (state_id), sin merge."""
+        return self.state_metrics[col].to_numpy()[df["state_id"].to_numpy()]
+
+
+def _first(columns, candidates):
+    return next((c for c in candidates if c in columns), None)
+
+
+def prepare_incidents(pk: pd.DataFrame):
+    """Detecta fecha/estado/ciudad y aplica el esquema. Devuelve (pk, date_col, state_col, city_col).
+
+    Si `pk` viene de `load_csv(..., "pk")` el esquema ya está aplicado y esto solo copia.
+    """
+    date_col = _first(pk.columns, DATE_COLS)
+    if date_col is None:
+        raise DatasetError("No se encontró columna de fecha en PoliceKillingsUS4 (ej. 'new_date').")
+    state_col = "state" if "state" in pk.columns else None
+    if state_col is None:
+        raise DatasetError("No se encontró columna de estado ('state') en PoliceKillingsUS4.")
+    city_col = "city" if "city" in pk.columns else None
+
+    pk = apply_schema(pk.copy(), INCIDENT_SCHEMA)
+    return pk, date_col, state_col, city_col
+
+
+def build_dataset(frames: dict, key: tuple = (), streams: dict | None = None) -> Dataset:
+    """frames: archivo lógico (ver `BUNDLED_FILES`) -> DataFrame normalizado o None.
+
+    streams: archivo lógico por ciudad -> ruta (o archivo binario) que se agrega en
+    streaming. Si hay alguno, todos los archivos por ciudad van por esa vía y no
+    se arma `city_table` (ni el índice de ciudades).
+    """
+    pk, pop = frames.get("pk"), frames.get("pop")
+    if pk is None or pop is None:
+        raise DatasetError("Sube al menos **PoliceKillingsUS4.csv** y **population2015.csv** para comenzar.")
+
+    pk, date_col, state_col, city_col = prepare_incidents(pk)
+    try:
+        # estados presentes en incidentes pero no en población (DC) entran con población NaN
+        dim = build_state_dim(pop, pk[[c for c in (state_col, "state_name") if c in pk.columns]])
+    except KeyError as e:
+        raise DatasetError(e.args[0]) from None
+
+    # Cada tabla de hechos se codifica a state_id una sola vez; después todo es búsqueda por índice
+    pk["state_id"] = dim.encode(pk[state_col])
+    city_frames = {}
+    for source in CITY_SOURCES:
+        df = frames.get(source)
+        if df is None:
+            continue
+        col = _first(df.columns, STATE_KEY_COLS)
+        if col is not None:
+            df = df.assign(state_id=dim.encode(df[col]))
+        city_frames[source] = df
+
+    cube = build_state_cube(pk, date_col, dim, state_col, city_col)
+    series = build_daily_series(pk, date_col, dim)
+    if streams:
+        city_table = None
+        state_metrics = load_streamed_metrics({**city_frames, **streams}, dim, key)
+    else:
+        city_table = build_city_table(city_frames, dim) if city_frames else None
+        state_metrics = state_rollup(city_table, dim) if city_table is not None else None
+    race_population = build_race_population(state_metrics, dim)
+    city_index = None
+    if city_table is not None and city_col is not None:
+        city_index = load_city_index(incident_pairs(pk, city_col), city_table, key)
+    return Dataset(pk=pk, dim=dim, cube=cube, series=series, state_metrics=state_metrics,
+                   race_population=race_population,
+                   races=frames.get("races"), date_col=date_col, state_col=state_col, city_col=city_col,
+                   key=key, city_table=city_table, city_index=city_index)
+
+
+def _concat_typed(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    """Concatena conservando categóricas: se agregan las categorías faltantes en vez de caer a object."""
+    b = b.reindex(columns=a.columns)
+    for c in a.columns:
+        if isinstance(a[c].dtype, pd.CategoricalDtype) and isinstance(b[c].dtype, pd.CategoricalDtype):
+            missing = b[c].cat.categories.difference(a[c].cat.categories)
+            if len(missing):
+                a = a.assign(**{c: a[c].cat.add_categories(missing)})
+            b = b.assign(**{c: b[c].cat.set_categories(a[c].cat.categories)})
+    return pd.concat([a, b], ignore_index=True)
+
+
+def _grow_state_metrics(metrics: pd.DataFrame | None, dim: StateDim) -> pd.DataFrame | None:
+    """Rollup estatal con una fila sin ciudades por cada estado agregado al final de `dim`."""
+    if metrics is None or len(metrics) == len(dim):
+        return metrics
+    new = np.arange(len(metrics), len(dim))
+    out = pd.concat([metrics, pd.DataFrame({"state_id": new, "state": dim.codes[new], "state_name": dim.names[new]})],
+                    ignore_index=True)
+    # conteos (ciudades, ciudades con dato) en 0 como en `state_rollup`; estadísticos NaN
+    counts = [c for c in metrics.columns if c == "n_cities" or c.endswith("_n")]
+    return out.assign(**{c: out[c].fillna(0).astype(metrics[c].dtype) for c in counts})
+
+
+def append_incidents(ds: Dataset, new_pk: pd.DataFrame, delta_key: str | None = None) -> Dataset:
+    """Aplica un lote de incidentes a `ds` usando 'id' como llave.
+
+    Filas con 'id' nuevo se agregan; con 'id' existente reemplazan a la anterior
+    (se resta la versión vieja del cubo y se suma la nueva). Solo cambian las
+    celdas (año, estado) tocadas; las métricas por ciudad no dependen de `pk` y
+    del índice de ciudades solo se emparejan las ciudades nuevas.
+
+    Un código de estado que no está en `ds.dim` se agrega al final (población NaN,
+    como DC en `build_dataset`); como crece el eje de estados, cubo y serie se
+    reconstruyen desde `pk` en vez de actualizarse por celdas.
+    """
+    if "id" not in ds.pk.columns or "id" not in new_pk.columns:
+        raise DatasetError("La actualización incremental necesita la columna 'id' en PoliceKillingsUS4.")
+    new_pk, date_col, state_col, _ = prepare_incidents(new_pk)
+    if (date_col, state_col) != (ds.date_col, ds.state_col):
+        raise DatasetError(f"La actualización usa columnas distintas ({date_col}, {state_col}) "
+                           f"a las del dataset ({ds.date_col}, {ds.state_col}).")
+    new_pk = new_pk.drop_duplicates("id", keep="last")
+    dim = ds.dim.extend(new_pk[[c for c in (state_col, "state_name") if c in new_pk.columns]])
+    new_pk["state_id"] = dim.encode(new_pk[state_col])
+
+    pos = pd.Index(ds.pk["id"]).get_indexer(new_pk["id"])
+    replaced = pos[pos >= 0]
+    removed = ds.pk.iloc[replaced]
+    keep = np.ones(len(ds.pk), dtype=bool)
+    keep[replaced] = False
+    pk = _concat_typed(ds.pk[keep], new_pk)
+    state_metrics, race_population = ds.state_metrics, ds.race_population
+    if len(dim) > len(ds.dim):
+        cube = build_state_cube(pk, date_col, dim, state_col, ds.city_col)
+        series = build_daily_series(pk, date_col, dim)
+        state_metrics = _grow_state_metrics(state_metrics, dim)
+        race_population = build_race_population(state_metrics, dim)
+    else:
+        cube = ds.cube.update(new_pk, removed, date_col, ds.city_col)
+        series = ds.series.update(new_pk, removed, date_col)
+    key = ds.key + ((("pk_delta", delta_key),) if delta_key else ())
+    city_index = ds.city_index
+    if city_index is not None:
+        city_index = city_index.extend(incident_pairs(new_pk, ds.city_col), ds.city_table)
+    return replace(ds, pk=pk, dim=dim, cube=cube, series=series, state_metrics=state_metrics,
+                   race_population=race_population, key=key, city_index=city_index)
+
+
+def load_sources(sources: dict, streams: dict | None = None) -> Dataset:
+    """sources: archivo lógico -> bytes del CSV (o None). La llave de versión sale de los hashes.
+
+    streams: archivo lógico por ciudad -> ruta, hasheada y agregada por bloques.
+    """
+    present = {k: v for k, v in sources.items() if v is not None}
+    hashes = {k: content_hash(v) for k, v in present.items()}
+    hashes.update({k: file_hash(p) for k, p in (streams or {}).items()})
+    return build_dataset(load_many(present), tuple(sorted(hashes.items())), streams=streams)
+
+
+def load_dir(data_dir=DATA_DIR, files: dict = BUNDLED_FILES, stream_threshold: int = STREAM_THRESHOLD) -> Dataset:
+    """Carga los CSV de un directorio (por defecto los incluidos en el repo).
+
+    Los archivos por ciudad de más de `stream_threshold` bytes no se leen completos: se agregan en streaming.
+    """
+    data_dir = Path(data_dir)
+    paths = {k: data_dir / name for k, name in files.items() if (data_dir / name).exists()}
+    streams = {k: p for k, p in paths.items() if k in CITY_SOURCES and should_stream(p, stream_threshold)}
+    return load_sources({k: p.read_bytes() for k, p in paths.items() if k not in streams}, streams)
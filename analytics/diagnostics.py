@@ -0,0 +1,99 @@
+# analytics/diagnostics.py
+"""Instrumentación opcional por rerun: tiempo por etapa, hit/miss de caché y memoria.
+
+Activación: variable de entorno DASHBOARD_DIAGNOSTICS=1 o el checkbox del
+sidebar. Desactivado, `Tracer` no mide nada (los context managers son no-op).
+Cada rerun se agrega como una línea JSON a DASHBOARD_TRACE_LOG
+(default .cache/traces.jsonl) para perfilar sesiones reales después.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .ingest import CACHE_DIR
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_LOG = Path(os.environ.get("DASHBOARD_TRACE_LOG", CACHE_DIR / "traces.jsonl"))
+
+
+def env_enabled() -> bool:
+    return os.environ.get("DASHBOARD_DIAGNOSTICS", "").lower() in ("1", "true", "yes", "on")
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class Tracer:
+    def __init__(self, enabled=False, session=None, script=None, log_path=TRACE_LOG):
+        self.enabled = enabled
+        self.session = session
+        self.script = script
+        self.log_path = Path(log_path)
+        self.t0 = time.perf_counter()
+        self.stages = []        # [{"name", "ms"}] en orden de término
+        self.cache = {}         # nombre -> "hit" | "miss"
+        self.frames = {}        # nombre -> {"rows", "mb"}
+        self._misses = set()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.append({"name": name, "ms": round((time.perf_counter() - t) * 1000, 3)})
+
+    def miss(self, name):
+        """Se llama dentro de la función cacheada: solo corre cuando la caché falla."""
+        self._misses.add(name)
+
+    @contextmanager
+    def cached(self, name):
+        """Envuelve la llamada a una función cacheada; hit si el cuerpo no llamó `miss(name)`."""
+        with self.stage(f"cache.{name}"):
+            yield
+        if self.enabled:
+            self.cache[name] = "miss" if name in self._misses else "hit"
+
+    def frame(self, name, df):
+        if self.enabled and df is not None:
+            self.frames[name] = {"rows": len(df),
+                                 "mb": round(df.memory_usage(deep=True).sum() / 2**20, 3)}
+
+    def record(self) -> dict:
+        return {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "session": self.session,
+            "script": self.script,
+            "total_ms": round((time.perf_counter() - self.t0) * 1000, 3),
+            "max_rss_mb": _max_rss_mb(),
+            "stages": self.stages,
+            "cache": self.cache,
+            "frames": self.frames,
+        }
+
+    def flush(self) -> dict | None:
+        """Escribe el rerun al JSONL; devuelve el registro (None si está desactivado)."""
+        if not self.enabled:
+            return None
+        rec = self.record()
+        try:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.log_path.open("a", encoding="utf-8") as f:
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+        return rec
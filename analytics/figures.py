@@ -0,0 +1,154 @@
+# analytics/figures.py
+"""Figuras Plotly del dashboard: tendencia OLS en forma cerrada, payload ligero y caché LRU.
+
+La tendencia se ajusta con NumPy (sin statsmodels) y se dibuja como un segmento
+de dos puntos. `slim` quita la plantilla de Plotly (~6 KB por figura) que el tema
+de Streamlit reemplaza en el navegador y redondea los datos enviados.
+`FigureCache` guarda figuras ya construidas por (versión de datos, gráfica, controles).
+El mapa por estado usa la geometría USA-states que trae plotly.js: la figura
+solo lleva los 51 códigos y el vector de valores.
+Plotly (`px` y `go`) se importa con la primera gráfica y no al importar este
+módulo (por eso las anotaciones usan "go.Figure" como texto). En el dashboard
+Streamlit ya importa plotly.graph_objects para su tema, así que ahí solo se
+difiere plotly.express; `prime` paga eso y la primera figura en el calentamiento.
+"""
+import importlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+DECIMALS = 4
+
+
+class LazyModule:
+    """Módulo que se importa en el primer acceso a un atributo (`px.bar` importa plotly.express)."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+# plotly.express: ~50 ms con Streamlit ya cargado, ~0.2 s sin él (CLI, scripts)
+px = LazyModule("plotly.express")
+go = LazyModule("plotly.graph_objects")
+
+
+def prime():
+    """Importa plotly.express y arma/serializa una figura desechable.
+
+    La primera figura del proceso carga plantilla y validadores; las siguientes cuestan menos.
+    """
+    px.bar(x=["a", "b"], y=[1, 2]).to_json()
+
+
+def ols_fit(x, y) -> dict:
+    """Recta de mínimos cuadrados y = a + b·x en forma cerrada; ignora pares con NaN."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ok = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[ok], y[ok]
+    n = len(x)
+    if n < 2 or np.ptp(x) == 0:
+        return {"slope": np.nan, "intercept": np.nan, "r2": np.nan, "n": n}
+    dx, dy = x - x.mean(), y - y.mean()
+    sxx, sxy, syy = dx @ dx, dx @ dy, dy @ dy
+    slope = sxy / sxx
+    r2 = sxy * sxy / (sxx * syy) if syy > 0 else np.nan
+    return {"slope": slope, "intercept": y.mean() - slope * x.mean(), "r2": r2, "n": n,
+            "x_min": x.min(), "x_max": x.max()}
+
+
+def add_trendline(fig: "go.Figure", x, y, name="Tendencia (OLS)") -> dict:
+    """Agrega la recta OLS como segmento entre el mínimo y el máximo de x; devuelve el ajuste."""
+    fit = ols_fit(x, y)
+    if np.isnan(fit["slope"]):
+        return fit
+    xs = np.array([fit["x_min"], fit["x_max"]])
+    fig.add_trace(go.Scatter(
+        x=xs, y=fit["intercept"] + fit["slope"] * xs, mode="lines", name=name, showlegend=False,
+        hovertemplate=(f"y = {fit['intercept']:.4g} + {fit['slope']:.4g}·x<br>"
+                       f"R² = {fit['r2']:.3f} (n = {fit['n']})<extra></extra>"),
+    ))
+    return fit
+
+
+def scatter_with_trend(df, x, y, **kwargs) -> "go.Figure":
+    """`px.scatter` + tendencia OLS en NumPy (reemplazo de `trendline="ols"`)."""
+    fig = px.scatter(df, x=x, y=y, **kwargs)
+    add_trendline(fig, df[x], df[y])
+    return fig
+
+
+def slim(fig: "go.Figure") -> "go.Figure":
+    """Payload mínimo: sin plantilla de Plotly y con valores numéricos redondeados."""
+    fig.update_layout(template=go.layout.Template())
+    for trace in fig.data:
+        for attr in ("x", "y"):
+            values = getattr(trace, attr, None)
+            if values is not None and np.asarray(values).dtype.kind == "f":
+                setattr(trace, attr, np.round(np.asarray(values), DECIMALS))
+    return fig
+
+
+@lru_cache(maxsize=8)
+def _map_base(codes: tuple) -> "go.Figure":
+    """Mapa sin valores (trazo, proyección, márgenes); se arma una vez por juego de estados."""
+    fig = go.Figure(go.Choropleth(locations=list(codes), locationmode="USA-states", colorscale="Reds",
+                                  marker_line_color="white", marker_line_width=0.5))
+    fig.update_layout(geo=dict(scope="usa", projection_type="albers usa", bgcolor="rgba(0,0,0,0)"),
+                      margin=dict(l=0, r=0, t=40, b=0))
+    return slim(fig)
+
+
+def state_map(codes, values, title, label, names=None) -> "go.Figure":
+    """Coroplético de EE. UU.: copia la base cacheada y solo cambia `z` (NaN = sin dato)."""
+    fig = go.Figure(_map_base(tuple(codes)))
+    z = np.round(np.asarray(values, dtype=float), DECIMALS)
+    fig.update_traces(z=z, colorbar_title_text=label, text=names,
+                      hovertemplate="%{location}" + (" · %{text}" if names is not None else "")
+                                    + "<br>%{z:,.4~g}<extra></extra>")
+    fig.update_layout(title=title)
+    return fig
+
+
+class FigureCache:
+    """LRU de figuras construidas, compartido entre sesiones y reruns (seguro entre hilos).
+
+    Las figuras guardadas no se modifican después de construirse; Streamlit solo las serializa.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """Figura para `key`; `build()` solo corre si no está en caché (el resultado pasa por `slim`)."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        fig = build()
+        if fig is not None:
+            fig = slim(fig)
+        with self._lock:
+            self.misses += 1
+            self._items[key] = fig
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+        return fig
+
+    def __len__(self):
+        return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
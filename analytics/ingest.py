@@ -0,0 +1,194 @@
+# analytics/ingest.py
+"""Ingesta de CSV: se parsea una sola vez y se guarda en Feather (columnar, tipado).
+
+Cada archivo se identifica por el hash de su contenido; en cargas posteriores
+(otra sesión, otro rerun, reinicio del servidor) se lee el Feather en lugar de
+volver a parsear el CSV. El DataFrame resultante es una copia en memoria de pandas
+(NumPy/categóricas, los tipos que usa el resto del paquete), no una vista del archivo.
+
+`load_many` puede parsear en paralelo (un proceso por archivo) los que aún no
+tienen Feather: los procesos escriben la caché y la sesión solo la lee, así que
+no viajan DataFrames entre procesos. Es opcional (DASHBOARD_INGEST_WORKERS):
+levantar el pool cuesta ~2 s y con los CSV del curso el parseo en serie es más
+rápido y usa menos memoria; conviene con archivos grandes y varios núcleos.
+"""
+import codecs
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from .schema import SCHEMAS, apply_schema, literal_columns
+
+# Subir este número invalida los Feather guardados cuando cambia la lógica de ingesta
+INGEST_VERSION = 3
+
+CACHE_DIR = Path(os.environ.get("DASHBOARD_CACHE_DIR",
+                                Path(__file__).resolve().parent.parent / ".cache"))
+
+BLOCK_SIZE = 1 << 20   # lectura por bloques para hashear/validar archivos grandes
+
+# Procesos para parsear archivos en frío (0 o 1 = en la sesión, uno tras otro; default)
+INGEST_WORKERS = int(os.environ.get("DASHBOARD_INGEST_WORKERS", 0))
+# Aun con workers, por debajo de esto (bytes en frío) se parsea en serie: con ~35 MB
+# (benchmarks.run, escala 10×) el pool todavía no compensa lo que cuesta levantarlo
+PARALLEL_MIN_BYTES = 64 * 2**20
+
+# Columnas llave con pocos valores distintos -> categóricas
+CATEGORICAL_COLS = ("state", "state_name", "city", "geographic_area", "id_state")
+
+
+def content_hash(data: bytes) -> str:
+    """Hash corto y estable del contenido crudo de un archivo."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def normalize_columns(columns) -> pd.Index:
+    """Mismo criterio que `norm_cols`: sin espacios, sin símbolos, minúsculas."""
+    return (pd.Index(columns).astype(str)
+              .str.strip()
+              .str.replace(r"\s+", "_", regex=True)
+              .str.replace(r"[^\w_]", "", regex=True)
+              .str.lower())
+
+
+def detect_encoding(data: bytes) -> str:
+    """utf-8 si el contenido es válido, si no latin-1 (validar es mucho más barato que parsear)."""
+    try:
+        data.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _blocks(source, block_size=BLOCK_SIZE):
+    """Bloques de bytes de una ruta o de un archivo binario abierto (se regresa al inicio)."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            yield from iter(lambda: f.read(block_size), b"")
+        return
+    source.seek(0)
+    yield from iter(lambda: source.read(block_size), b"")
+    source.seek(0)
+
+
+def file_hash(source) -> str:
+    """`content_hash` de un archivo leído por bloques, sin cargarlo completo en memoria."""
+    h = hashlib.blake2b(digest_size=16)
+    for block in _blocks(source):
+        h.update(block)
+    return h.hexdigest()
+
+
+def detect_file_encoding(source) -> str:
+    """`detect_encoding` por bloques: el decodificador incremental respeta caracteres partidos entre bloques."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        for block in _blocks(source):
+            decoder.decode(block)
+        decoder.decode(b"", final=True)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def parse_csv(data: bytes, kind: str | None = None) -> pd.DataFrame:
+    """Parsea el CSV una sola vez, normaliza columnas y tipa las llaves como categóricas.
+
+    `kind` es el archivo lógico (ej. "pk"); si tiene esquema en `SCHEMAS` se aplica aquí.
+    """
+    encoding = detect_encoding(data)
+    converters = None
+    if kind in SCHEMAS:
+        # columnas de código se leen como texto literal (sin convertir "NA" a NaN)
+        literal = literal_columns(SCHEMAS[kind])
+        raw = pd.read_csv(io.BytesIO(data), nrows=0, encoding=encoding).columns
+        converters = {r: str for r, c in zip(raw, normalize_columns(raw)) if c in literal} or None
+    df = pd.read_csv(io.BytesIO(data), low_memory=False, encoding=encoding, converters=converters)
+    df.columns = normalize_columns(df.columns)
+    for c in CATEGORICAL_COLS:
+        if c in df.columns and not isinstance(df[c].dtype, pd.CategoricalDtype):
+            df[c] = df[c].astype("category")
+    if kind in SCHEMAS:
+        df = apply_schema(df, SCHEMAS[kind])
+    return df
+
+
+def cache_path(key: str) -> Path:
+    return CACHE_DIR / f"{key}-v{INGEST_VERSION}.feather"
+
+
+def _feather_path(data: bytes, kind: str | None) -> Path:
+    key = content_hash(data)
+    return cache_path(f"{key}-{kind}" if kind in SCHEMAS else key)
+
+
+def load_csv(data: bytes, kind: str | None = None) -> pd.DataFrame:
+    """Devuelve el DataFrame del CSV usando el Feather cacheado si ya existe."""
+    path = _feather_path(data, kind)
+    if path.exists():
+        try:
+            # memory_map evita un búfer de lectura intermedio; `to_pandas` igual copia cada columna
+            return feather.read_table(path, memory_map=True).to_pandas()
+        except Exception:
+            path.unlink(missing_ok=True)  # archivo corrupto/incompleto: se regenera
+
+    df = parse_csv(data, kind)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # escritura atómica: otra sesión nunca ve un Feather a medias
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, path)
+    except OSError:
+        pass  # sin disco escribible seguimos funcionando, solo sin caché
+    return df
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    """Pool de procesos del módulo; se crea al primer uso y se reutiliza (levantar procesos es caro)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: el servidor de Streamlit tiene hilos y hacer fork con hilos no es seguro
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _executor
+
+
+def _reset_pool():
+    """Descarta un pool roto (un hijo murió); el siguiente uso levanta uno nuevo."""
+    global _executor
+    with _executor_lock:
+        _executor = None
+
+
+def _parse_worker(data: bytes, kind: str | None):
+    """En el proceso hijo: parsea y escribe el Feather. Solo devuelve el DataFrame si no se pudo cachear."""
+    df = load_csv(data, kind)
+    return None if _feather_path(data, kind).exists() else df
+
+
+def load_many(sources: dict, workers: int = INGEST_WORKERS) -> dict:
+    """sources: archivo lógico -> bytes del CSV. Igual que `load_csv` por archivo, con los fríos en paralelo."""
+    cold = [k for k, data in sources.items() if not _feather_path(data, k).exists()]
+    parsed = {}
+    if workers > 1 and len(cold) > 1 and sum(len(sources[k]) for k in cold) >= PARALLEL_MIN_BYTES:
+        try:
+            futures = {k: _pool(workers).submit(_parse_worker, sources[k], k) for k in cold}
+            parsed = {k: f.result() for k, f in futures.items()}
+        except (BrokenProcessPool, OSError):
+            _reset_pool()   # esta carga sigue en serie
+            parsed = {}
+    # calientes y los que ya dejó el pool: lectura del Feather; el resto se parsea aquí
+    return {k: parsed[k] if parsed.get(k) is not None else load_csv(data, k) for k, data in sources.items()}
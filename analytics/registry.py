@@ -0,0 +1,125 @@
+# analytics/registry.py
+"""Registro de datasets compartido por todo el proceso (todas las sesiones).
+
+Los CSV incluidos en el repo (o los de DASHBOARD_DATA_DIR, administrado por
+quien despliega) se identifican una vez por proceso por su hash; cada sesión
+pide el Dataset y recibe el mismo objeto, construido una sola vez. Las subidas
+del usuario son opcionales y solo reemplazan el archivo que traen: la llave de
+versión combina hashes de archivos incluidos y subidos, así que dos sesiones con
+los mismos datos comparten entrada aunque uno suba y otro no.
+
+Los Dataset se tratan como inmutables: con Copy-on-Write de pandas, cualquier
+modificación de una sesión crea su propia copia y no altera la compartida.
+
+Los archivos se hashean por bloques; los CSV por ciudad que superan el umbral de
+streaming nunca se cargan completos (ver `stream`).
+
+El candado del registro solo protege los diccionarios: hashear y construir ocurre
+fuera de él, con una construcción en curso por versión (las sesiones que piden
+esa misma versión esperan su resultado; las demás no esperan a nadie).
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+from .dataset import BUNDLED_FILES, CITY_SOURCES, DATA_DIR, Dataset, build_dataset
+from .ingest import content_hash, file_hash, load_many
+from .stream import STREAM_THRESHOLD, should_stream
+
+REGISTRY_DIR = Path(os.environ.get("DASHBOARD_DATA_DIR", DATA_DIR))
+
+
+class DatasetRegistry:
+    def __init__(self, data_dir=REGISTRY_DIR, files: dict = BUNDLED_FILES, max_entries: int = 4,
+                 stream_threshold: int = STREAM_THRESHOLD):
+        self.data_dir = Path(data_dir)
+        self.files = dict(files)
+        self.max_entries = max_entries
+        self.stream_threshold = stream_threshold
+        self._stats = {}                 # archivo lógico -> (mtime_ns, tamaño) del último hash
+        self._hashes = {}                # archivo lógico -> hash del contenido en disco
+        self._datasets = OrderedDict()   # llave de versión -> Dataset (LRU)
+        self._building = {}              # llave de versión -> Future de la construcción en curso
+        self._lock = threading.Lock()
+        self.builds = 0
+
+    def _path(self, kind) -> Path:
+        return self.data_dir / self.files[kind]
+
+    def bundled(self) -> dict:
+        """Archivo lógico -> hash de los CSV en disco; solo se vuelve a leer el que cambió (mtime/tamaño)."""
+        with self._lock:
+            known_stats, known_hashes = dict(self._stats), dict(self._hashes)
+        stats, hashes = {}, {}
+        for kind in self.files:
+            try:
+                st = self._path(kind).stat()
+            except OSError:
+                continue
+            stats[kind] = (st.st_mtime_ns, st.st_size)
+            # hashear un archivo grande fuera del candado: los hits de otras sesiones no esperan
+            hashes[kind] = (known_hashes[kind] if known_stats.get(kind) == stats[kind]
+                            else file_hash(self._path(kind)))
+        with self._lock:
+            self._stats, self._hashes = stats, hashes
+        return dict(hashes)
+
+    def get(self, overrides: dict | None = None, kinds=None, on_build=None) -> Dataset:
+        """Dataset compartido para los archivos incluidos + `overrides` (archivo lógico -> bytes).
+
+        `kinds` limita los archivos lógicos que entran (None = todos). `on_build`
+        se llama solo si hay que construir (p. ej. para marcar un miss en diagnóstico).
+        """
+        overrides = {k: v for k, v in (overrides or {}).items() if v is not None}
+        hashes = {k: h for k, h in self.bundled().items() if kinds is None or k in kinds}
+        hashes.update({k: content_hash(v) for k, v in overrides.items()})
+        key = tuple(sorted(hashes.items()))
+        with self._lock:
+            if key in self._datasets:
+                self._datasets.move_to_end(key)
+                return self._datasets[key]
+            # sesiones simultáneas con los mismos datos esperan a la primera en vez de
+            # construir cada una su copia
+            future = self._building.get(key)
+            owner = future is None
+            if owner:
+                future = self._building[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            if on_build is not None:
+                on_build()
+            ds = self._build(hashes, overrides)
+            future.set_result(ds)
+            return ds
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+
+    def _build(self, hashes: dict, overrides: dict) -> Dataset:
+        """Lee, parsea y construye fuera del candado; guarda el Dataset bajo la llave de lo que leyó."""
+        # CSV por ciudad grandes del directorio: agregados por bloques, sin cargarlos completos
+        streams = {k: self._path(k) for k in hashes if k not in overrides and k in CITY_SOURCES
+                   and should_stream(self._path(k), self.stream_threshold)}
+        sources = {k: overrides[k] if k in overrides else self._path(k).read_bytes()
+                   for k in hashes if k not in streams}
+        # hash de los bytes leídos: si un archivo cambió desde `bundled()`, no se guarda bajo el hash viejo
+        hashes = {**hashes, **{k: content_hash(v) for k, v in sources.items() if k not in overrides}}
+        key = tuple(sorted(hashes.items()))
+        # archivos fríos en paralelo si está activado (un proceso por archivo); los calientes se leen del Feather
+        ds = build_dataset(load_many(sources), key, streams=streams)
+        with self._lock:
+            self.builds += 1
+            self._datasets[key] = ds
+            self._datasets.move_to_end(key)
+            while len(self._datasets) > self.max_entries:
+                self._datasets.popitem(last=False)
+        return ds
+
+    def __len__(self):
+        return len(self._datasets)
@@ -0,0 +1,114 @@
+# analytics/schema.py
+"""Esquema explícito de PoliceKillingsUS4: dtypes compactos fijados en la ingesta.
+
+Con el esquema aplicado, los filtros demográficos y de arma son comparaciones
+de códigos sobre arreglos pequeños (categorías, booleanos, Int8), sin
+`astype(str)` ni `to_numeric` por rerun. Aplicarlo dos veces no cambia nada.
+
+Las columnas "code" son categóricas cuyo texto se lee literal: en Races.csv y
+en `race` el código "NA" es Native American, no un faltante.
+"""
+import numpy as np
+import pandas as pd
+
+DATE_FORMAT = "%m/%d/%Y"
+
+# columna -> (tipo, normalización del texto de las categorías)
+INCIDENT_SCHEMA = {
+    "state": ("category", "upper"),
+    "state_name": ("category", "upper"),
+    "city": ("category", None),
+    "gender": ("category", "upper"),
+    "race": ("code", "upper"),
+    "armed": ("category", "lower"),
+    "threat_level": ("category", "lower"),
+    "flee": ("category", None),
+    "manner_of_death": ("category", "lower"),
+    "signs_of_mental_illness": ("boolean", None),
+    "body_camera": ("boolean", None),
+    "age": ("Int8", None),
+    "new_date": ("date", None),
+    "date": ("date", None),
+    "incident_date": ("date", None),
+}
+
+TRUE_VALUES = ("true", "t", "yes", "y", "1")
+FALSE_VALUES = ("false", "f", "no", "n", "0")
+
+
+def _category(s: pd.Series, case=None) -> pd.Series:
+    """Categórica con etiquetas limpias; el texto se normaliza sobre las categorías, no sobre filas."""
+    if not isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype("category")
+    cats = s.cat.categories.astype(str).str.strip()
+    if case == "upper":
+        cats = cats.str.upper()
+    elif case == "lower":
+        cats = cats.str.lower()
+    if cats.equals(s.cat.categories):
+        return s
+    # varias categorías pueden colapsar en una (ej. "Gun" y "gun "); vacías -> faltante
+    new_codes, labels = pd.factorize(cats.where(cats != "", None), sort=True)
+    remap = np.append(new_codes, -1)  # el código -1 (faltante) se conserva
+    codes = remap[s.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=s.index, name=s.name)
+
+
+def _boolean(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(s.dtype):
+        return s.astype("boolean")
+    text = s.astype("string").str.strip().str.lower()
+    out = pd.Series(pd.NA, index=s.index, dtype="boolean")
+    out[text.isin(TRUE_VALUES).fillna(False)] = True
+    out[text.isin(FALSE_VALUES).fillna(False)] = False
+    return out
+
+
+def _small_int(s: pd.Series) -> pd.Series:
+    """Edad en Int8; fuera de rango (0–127) o no numérica -> faltante."""
+    if s.dtype == "Int8":
+        return s
+    a = pd.to_numeric(s, errors="coerce").round()
+    return a.where(a.between(0, np.iinfo(np.int8).max)).astype("Int8")
+
+
+def parse_dates(s: pd.Series, fmt: str = DATE_FORMAT) -> pd.Series:
+    """Formato fijo (rápido); solo lo que no calza se intenta con inferencia."""
+    if pd.api.types.is_datetime64_any_dtype(s.dtype):
+        return s
+    out = pd.to_datetime(s, format=fmt, errors="coerce")
+    bad = out.isna() & s.notna()
+    if bad.any():
+        out[bad] = pd.to_datetime(s[bad], format="mixed", errors="coerce")
+    return out
+
+
+def apply_schema(df: pd.DataFrame, schema: dict = INCIDENT_SCHEMA) -> pd.DataFrame:
+    """Tipa las columnas presentes según `schema`; las demás quedan como vienen."""
+    for col, (kind, case) in schema.items():
+        if col not in df.columns:
+            continue
+        if kind in ("category", "code"):
+            df[col] = _category(df[col], case)
+        elif kind == "boolean":
+            df[col] = _boolean(df[col])
+        elif kind == "Int8":
+            df[col] = _small_int(df[col])
+        elif kind == "date":
+            df[col] = parse_dates(df[col])
+    return df
+
+
+RACES_SCHEMA = {
+    "race_id": ("code", "upper"),
+    "race": ("category", None),
+}
+
+
+def literal_columns(schema: dict) -> set:
+    """Columnas que el parser no debe convertir a NaN ("NA" es un código válido)."""
+    return {col for col, (kind, _) in schema.items() if kind == "code"}
+
+
+# archivo lógico -> esquema aplicado en la ingesta
+SCHEMAS = {"pk": INCIDENT_SCHEMA, "races": RACES_SCHEMA}
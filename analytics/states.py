@@ -0,0 +1,103 @@
+# analytics/states.py
+"""Dimensión de estados con llave entera, construida desde population2015.csv.
+
+Todas las tablas de hechos (incidentes, ingreso, % raza, pobreza, preparatoria)
+se codifican a `state_id` una sola vez al cargar; después cada tasa o unión es
+una búsqueda por índice en arreglos de 51 elementos en vez de un merge de texto.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+CODE_COLS = ("id_state", "state_code", "state_abbr")
+NAME_COLS = ("state", "state_name", "geographic_area")
+POP_COLS = ("2015_population", "population_2015", "population", "pop_2015")
+
+
+def _first(columns, candidates):
+    return next((c for c in candidates if c in columns), None)
+
+
+@dataclass(frozen=True)
+class StateDim:
+    codes: np.ndarray        # (S,) "AL"
+    names: np.ndarray        # (S,) "ALABAMA"
+    population: np.ndarray   # (S,) población 2015 (float, NaN si falta)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def encode(self, values) -> np.ndarray:
+        """Código o nombre de estado (sin importar mayúsculas) -> state_id; -1 si no existe.
+
+        La normalización de texto se hace sobre los valores distintos, no por fila.
+        """
+        s = pd.Series(values)
+        if not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype("category")
+        lookup = {k: i for i, k in enumerate(self.codes)}
+        lookup.update({k: i for i, k in enumerate(self.names)})
+        cats = s.cat.categories.astype(str).str.strip().str.upper()
+        cat_ids = np.array([lookup.get(c, -1) for c in cats] + [-1], dtype=np.intp)
+        return cat_ids[s.cat.codes.to_numpy()]  # código -1 (NaN) cae en el -1 final
+
+    def label(self, df: pd.DataFrame, id_col="state_id") -> pd.DataFrame:
+        """Agrega 'state_name' por búsqueda directa."""
+        ids = df[id_col].to_numpy()
+        return df.assign(state_name=np.where(ids >= 0, self.names[ids], None))
+
+    def add_rates(self, df: pd.DataFrame, count_col="count", id_col="state_id",
+                  dropna=False) -> pd.DataFrame:
+        """Agrega 'state_name', 'population_2015' y 'rate_per_million' sin merge."""
+        ids = df[id_col].to_numpy()
+        ok = ids >= 0
+        population = np.full(len(ids), np.nan)
+        population[ok] = self.population[ids[ok]]
+        out = self.label(df, id_col).assign(population_2015=population)
+        out["rate_per_million"] = out[count_col].to_numpy() / population * 1_000_000
+        if dropna:
+            out = out[~np.isnan(population)]
+        return out
+
+    def extend(self, extra: pd.DataFrame) -> "StateDim":
+        """Agrega al final los estados de `extra` que no están (código de 2 letras), con población NaN.
+
+        `extra` es p. ej. `pk[['state', 'state_name']]`; los state_id existentes no cambian.
+        """
+        x_code = _first(extra.columns, ("state",) + CODE_COLS)
+        if x_code is None:
+            return self
+        x_name = _first([c for c in extra.columns if c != x_code], NAME_COLS)
+        x = extra[[x_code] + ([x_name] if x_name else [])].drop_duplicates().astype(str)
+        x_codes = x[x_code].str.strip().str.upper()
+        x_names = x[x_name].str.strip().str.upper() if x_name else x_codes
+        new = ~x_codes.isin(self.codes) & x_codes.str.fullmatch(r"[A-Z]{2}")
+        x_codes, x_names = x_codes[new], x_names[new]
+        keep = ~x_codes.duplicated()
+        if not keep.any():
+            return self
+        return StateDim(codes=np.append(self.codes, x_codes[keep].to_numpy(dtype=object)),
+                        names=np.append(self.names, x_names[keep].to_numpy(dtype=object)),
+                        population=np.append(self.population, np.full(int(keep.sum()), np.nan)))
+
+
+def build_state_dim(pop: pd.DataFrame, extra: pd.DataFrame | None = None) -> StateDim:
+    """Espera columnas normalizadas tipo 'id_state', 'state', '2015_population'.
+
+    `extra` (p. ej. `pk[['state', 'state_name']]`) agrega estados que aparecen en
+    los hechos pero no en el archivo de población (DC); quedan con población NaN.
+    """
+    code_col = _first(pop.columns, CODE_COLS)
+    name_col = _first([c for c in pop.columns if c != code_col], NAME_COLS)
+    pop_col = _first(pop.columns, POP_COLS)
+    if code_col is None or name_col is None or pop_col is None:
+        raise KeyError("population2015.csv debe contener código de estado, nombre y población "
+                       "(ej. 'ID State', 'State', '2015 population').")
+    population = pd.to_numeric(pop[pop_col].astype(str).str.replace(",", "", regex=False),
+                               errors="coerce")
+    codes = pop[code_col].astype(str).str.strip().str.upper()
+    names = pop[name_col].astype(str).str.strip().str.upper()
+    dim = StateDim(codes=codes.to_numpy(dtype=object), names=names.to_numpy(dtype=object),
+                   population=population.to_numpy(dtype=float))
+    return dim.extend(extra) if extra is not None else dim
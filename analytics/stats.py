@@ -0,0 +1,145 @@
+# analytics/stats.py
+"""Correlaciones estado × métrica: cada covariable estatal contra cada tasa de incidentes.
+
+Todo el panel es un solo cálculo NumPy sobre las matrices X (estados × covariables)
+e Y (estados × tasas): Pearson, Spearman, pendiente OLS, R² e intervalos
+bootstrap salen de sumas enmascaradas (`einsum`), sin un ajuste por gráfica.
+Cada par usa solo los estados con dato en ambas columnas (DC no tiene población,
+así que no entra en las tasas).
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .acs import CITY_METRICS
+from .dataset import Dataset
+from .weapons import CLASS_LABELS
+
+# tasa por millón -> etiqueta; las clases de arma salen del cubo como `state_values`
+# (incidentes que involucran la clase, así que una etiqueta compuesta cuenta en varias)
+RATE_METRICS = {
+    "total": "Incidentes",
+    "mental": "Con indicios de enfermedad mental",
+    **{c: CLASS_LABELS[c] for c in ("firearm", "blade", "vehicle", "toy", "unarmed")},
+}
+# coeficiente -> etiqueta para la matriz del panel
+COEFFICIENTS = {"pearson": "Pearson", "spearman": "Spearman", "r2": "R²"}
+N_BOOT = 1000
+CI = 0.95
+
+
+def covariates(ds: Dataset) -> tuple:
+    """(columnas, etiquetas, X (S, P)) con las métricas estatales disponibles (estadístico principal)."""
+    cols = [c for c in CITY_METRICS if ds.has_metric(c)]
+    X = (np.column_stack([ds.state_metrics[c].to_numpy(dtype=float) for c in cols]) if cols
+         else np.empty((len(ds.dim), 0)))
+    return cols, [CITY_METRICS[c].label for c in cols], X
+
+
+def incident_rates(ds: Dataset, year) -> tuple:
+    """(métricas, etiquetas, Y (S, Q)) tasas por millón de `RATE_METRICS` en `year`."""
+    has = {"total": True, "mental": "signs_of_mental_illness" in ds.pk.columns}
+    metrics = [m for m in RATE_METRICS if has.get(m, "armed" in ds.pk.columns)]   # clases: columna 'armed'
+    Y = np.column_stack([ds.cube.state_values(m, year) for m in metrics]) / ds.dim.population[:, None] * 1_000_000
+    return metrics, [RATE_METRICS[m] for m in metrics], Y
+
+
+def _avg_ranks(A: np.ndarray, M: np.ndarray) -> np.ndarray:
+    """Rangos promedio (empates = media) por columna entre las filas válidas de `M`; (S, …)."""
+    valid_j = M[None]
+    less = ((A[None] < A[:, None]) & valid_j).sum(axis=1)    # j < i, para cada i
+    equal = ((A[None] == A[:, None]) & valid_j).sum(axis=1)
+    return np.where(M, less + (equal + 1) / 2, 0.0)
+
+
+def _moments(W, X, Y):
+    """Sumas enmascaradas de cada par: n, Σx, Σy, Σx², Σy², Σxy (…, P, Q)."""
+    n = W.sum(axis=-3)
+    sx = np.einsum("...spq,...sp->...pq", W, X)
+    sy = np.einsum("...spq,...sq->...pq", W, Y)
+    sxx = np.einsum("...spq,...sp->...pq", W, X * X)
+    syy = np.einsum("...spq,...sq->...pq", W, Y * Y)
+    sxy = np.einsum("...spq,...sp,...sq->...pq", W, X, Y)
+    return n, sx, sy, sxx, syy, sxy
+
+
+def _fit(n, sx, sy, sxx, syy, sxy):
+    """Pearson y pendiente OLS desde las sumas (NaN con < 3 pares o varianza 0)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        vx, vy = sxx - sx * sx / n, syy - sy * sy / n
+        r = cov / np.sqrt(vx * vy)
+        slope = cov / vx
+    few = (n < 3) | (vx <= 0) | (vy <= 0)
+    return np.where(few, np.nan, r), np.where(few, np.nan, slope)
+
+
+def correlation_matrix(X: np.ndarray, Y: np.ndarray, n_boot: int = N_BOOT, ci: float = CI,
+                       seed: int = 0) -> dict:
+    """Estadísticos (P, Q) de cada covariable (columna de X) contra cada tasa (columna de Y).
+
+    Claves: n, pearson, spearman, slope, intercept, r2 y pearson_lo/hi, slope_lo/hi
+    (percentiles bootstrap remuestreando estados, semilla fija para que sea estable).
+    """
+    Mx, My = ~np.isnan(X), ~np.isnan(Y)
+    # centrar por columna no cambia covarianzas y evita cancelación con ingresos ~5e4
+    cx, cy = np.nanmean(X, axis=0), np.nanmean(Y, axis=0)
+    X0, Y0 = np.where(Mx, X - cx, 0.0), np.where(My, Y - cy, 0.0)
+    W = (Mx[:, :, None] & My[:, None, :]).astype(float)      # (S, P, Q) par válido
+
+    n, sx, sy, sxx, syy, sxy = _moments(W, X0, Y0)
+    pearson, slope = _fit(n, sx, sy, sxx, syy, sxy)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        intercept = (sy - slope * sx) / n + cy[None, :] - slope * cx[:, None]
+
+    # Spearman = Pearson de los rangos, con rangos recalculados sobre los estados válidos de cada par
+    Wb = W.astype(bool)
+    Rx = _avg_ranks(np.broadcast_to(X0[:, :, None], W.shape), Wb)
+    Ry = _avg_ranks(np.broadcast_to(Y0[:, None, :], W.shape), Wb)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sr = np.einsum("spq,spq->pq", Rx, Ry) - (n * (n + 1) / 2) ** 2 / n
+        vr = np.sqrt((np.einsum("spq,spq->pq", Rx, Rx) - (n * (n + 1) / 2) ** 2 / n)
+                     * (np.einsum("spq,spq->pq", Ry, Ry) - (n * (n + 1) / 2) ** 2 / n))
+        spearman = np.where(np.isnan(pearson), np.nan, sr / vr)
+
+    out = {"n": n.astype(np.int64), "pearson": pearson, "spearman": spearman, "slope": slope,
+           "intercept": intercept, "r2": pearson ** 2}
+    if n_boot:
+        # (B, S) índices remuestreados; todas las réplicas y pares en una sola pasada
+        idx = np.random.default_rng(seed).integers(0, len(X), size=(n_boot, len(X)))
+        r_b, slope_b = _fit(*_moments(W[idx], X0[idx], Y0[idx]))
+        tail = (1 - ci) / 2 * 100
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)   # pares sin réplicas válidas -> NaN
+            for name, boot in (("pearson", r_b), ("slope", slope_b)):
+                lo, hi = np.nanpercentile(boot, [tail, 100 - tail], axis=0)
+                out[f"{name}_lo"] = np.where(np.isnan(out[name]), np.nan, lo)
+                out[f"{name}_hi"] = np.where(np.isnan(out[name]), np.nan, hi)
+    return out
+
+
+def correlation_table(ds: Dataset, year, n_boot: int = N_BOOT, ci: float = CI) -> pd.DataFrame | None:
+    """Formato largo: una fila por (covariable, tasa), ordenada por |Pearson|; None sin covariables."""
+    cols, col_labels, X = covariates(ds)
+    if not cols:
+        return None
+    metrics, metric_labels, Y = incident_rates(ds, year)
+    stats = correlation_matrix(X, Y, n_boot, ci)
+    P, Q = len(cols), len(metrics)
+    out = pd.DataFrame({
+        "covariate": np.repeat(cols, Q),
+        "covariate_label": np.repeat(col_labels, Q),
+        "metric": np.tile(metrics, P),
+        "metric_label": np.tile(metric_labels, P),
+        **{k: v.ravel() for k, v in stats.items()},
+    })
+    return out.sort_values("pearson", key=np.abs, ascending=False, na_position="last", ignore_index=True)
+
+
+def grid(table: pd.DataFrame, value: str = "pearson") -> pd.DataFrame:
+    """Matriz covariable × tasa de `value`, en el orden de `CITY_METRICS` y `RATE_METRICS`."""
+    present_rows, present_cols = set(table["covariate_label"]), set(table["metric_label"])
+    rows = [m.label for m in CITY_METRICS.values() if m.label in present_rows]
+    cols = [label for label in RATE_METRICS.values() if label in present_cols]
+    return table.pivot(index="covariate_label", columns="metric_label", values=value).loc[rows, cols]
@@ -0,0 +1,224 @@
+# analytics/stream.py
+"""Ingesta en streaming de los CSV por ciudad: agregados por estado sin la tabla completa.
+
+Para extractos ACS de varios años (millones de filas) solo se necesita el rollup
+estatal. Cada archivo se lee en bloques de `CHUNK_ROWS` filas (solo las columnas
+usadas) y cada bloque actualiza acumuladores por estado: conteo, suma, suma
+ponderada y un resumen de cuantiles de tamaño fijo para la mediana. La memoria
+pico depende del tamaño de bloque y del número de estados, no del archivo.
+
+Diferencias con `state_rollup` (tabla por ciudad en memoria):
+- cada fila cuenta: una ciudad repetida (varios años) pesa una vez por fila;
+- la población de un archivo solo pondera las métricas de ese mismo archivo;
+- la mediana es exacta mientras un estado tenga ≤ 2·`SKETCH_SIZE` valores y
+  aproximada (centroides de peso similar) por encima de eso;
+- no hay `CityTable`, así que el detalle por ciudad se muestra sin métricas ACS.
+
+El rollup se guarda en Feather por versión de datos, como la caché de ingesta.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from .acs import CITY_COLS, CITY_METRICS, STATE_COLS, WEIGHT_COLS, parse_numeric
+from .ingest import cache_path, content_hash, detect_file_encoding, normalize_columns
+from .states import StateDim
+
+CHUNK_ROWS = 200_000
+SKETCH_SIZE = 1024
+# CSV por ciudad más grandes que esto (bytes) se agregan en streaming al cargar un directorio
+STREAM_THRESHOLD = int(float(os.environ.get("DASHBOARD_STREAM_MB", 256)) * 2**20)
+STREAM_VERSION = 1   # subir si cambia la agregación: invalida los rollups guardados
+
+
+def _first(columns, candidates):
+    return next((c for c in candidates if c in columns), None)
+
+
+class QuantileSketch:
+    """Resumen de cuantiles acotado: valores con peso que se funden en centroides al crecer."""
+    __slots__ = ("size", "values", "weights", "exact")
+
+    def __init__(self, size: int = SKETCH_SIZE):
+        self.size = size
+        self.values = np.empty(0)
+        self.weights = np.empty(0)
+        self.exact = True   # True mientras no se haya comprimido (todos los pesos = 1)
+
+    def add(self, values: np.ndarray):
+        self.values = np.concatenate((self.values, values))
+        self.weights = np.concatenate((self.weights, np.ones(len(values))))
+        if len(self.values) > 2 * self.size:
+            self._compress()
+
+    def _compress(self):
+        # `size` grupos de peso similar en orden de valor; cada grupo -> su media ponderada
+        order = np.argsort(self.values, kind="stable")
+        v, w = self.values[order], self.weights[order]
+        cum = np.cumsum(w)
+        bucket = np.minimum(((cum - w / 2) / cum[-1] * self.size).astype(np.intp), self.size - 1)
+        weights = np.bincount(bucket, weights=w, minlength=self.size)
+        sums = np.bincount(bucket, weights=v * w, minlength=self.size)
+        keep = weights > 0
+        self.values, self.weights = sums[keep] / weights[keep], weights[keep]
+        self.exact = False
+
+    def quantile(self, q: float) -> float:
+        if not len(self.values):
+            return np.nan
+        if self.exact:
+            return float(np.quantile(self.values, q))
+        order = np.argsort(self.values)
+        v, w = self.values[order], self.weights[order]
+        # cada centroide representa la posición media de su peso acumulado
+        centers = np.cumsum(w) - w / 2
+        return float(np.interp(q * w.sum(), centers, v))
+
+
+class RunningStats:
+    """Acumuladores por estado de una métrica: conteos, sumas y un `QuantileSketch` por estado."""
+
+    def __init__(self, n_groups: int, sketch_size: int = SKETCH_SIZE):
+        self.n_valid = np.zeros(n_groups, dtype=np.int64)
+        self.total = np.zeros(n_groups)
+        self.weighted = np.zeros(n_groups)
+        self.weight = np.zeros(n_groups)
+        self.has_weights = False
+        self.sketches = [QuantileSketch(sketch_size) for _ in range(n_groups)]
+
+    def update(self, ids: np.ndarray, values: np.ndarray, weights: np.ndarray | None = None):
+        ok = (ids >= 0) & ~np.isnan(values)
+        g, v = ids[ok], values[ok]
+        n = len(self.n_valid)
+        counts = np.bincount(g, minlength=n)
+        self.n_valid += counts
+        self.total += np.bincount(g, weights=v, minlength=n)
+        if weights is not None:
+            w = weights[ok]
+            w_ok = ~np.isnan(w)
+            self.weighted += np.bincount(g[w_ok], weights=v[w_ok] * w[w_ok], minlength=n)
+            self.weight += np.bincount(g[w_ok], weights=w[w_ok], minlength=n)
+            self.has_weights = True
+        # un corte por estado sobre el bloque ordenado por estado
+        order = np.argsort(g, kind="stable")
+        v_sorted = v[order]
+        ends = np.cumsum(counts)
+        for s in np.flatnonzero(counts):
+            self.sketches[s].add(v_sorted[ends[s] - counts[s]:ends[s]])
+
+    def finish(self) -> dict:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out = {"n_valid": self.n_valid, "mean": self.total / self.n_valid,
+                   "median": np.array([s.quantile(0.5) for s in self.sketches])}
+            if self.has_weights:
+                out["weighted_mean"] = self.weighted / self.weight
+        return out
+
+
+def _read_chunks(source, chunk_rows: int):
+    """(bloques, columnas normalizadas -> crudas) de una ruta, archivo binario o DataFrame ya cargado."""
+    if isinstance(source, pd.DataFrame):
+        return [source], {c: c for c in source.columns}
+    encoding = detect_file_encoding(source)
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    raw = pd.read_csv(source, nrows=0, encoding=encoding).columns
+    columns = dict(zip(normalize_columns(raw), raw))
+    wanted = [_first(columns, STATE_COLS), _first(columns, CITY_COLS), _first(columns, WEIGHT_COLS),
+              *(_first(columns, spec.candidates) for spec in CITY_METRICS.values())]
+    usecols = [columns[c] for c in dict.fromkeys(w for w in wanted if w is not None)]
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    state_raw = columns.get(_first(columns, STATE_COLS))
+    chunks = pd.read_csv(source, usecols=usecols, chunksize=chunk_rows, encoding=encoding,
+                         dtype={state_raw: "category"} if state_raw else None)
+    return chunks, {c: r for c, r in columns.items() if r in usecols}
+
+
+def _add_cities(cities: dict, ids: np.ndarray, names: pd.Series):
+    """Agrega los hashes de ciudad de un bloque al conjunto de su estado."""
+    ok = ids >= 0
+    hashes = pd.util.hash_array(names.fillna("").to_numpy(dtype=object)[ok])
+    g = ids[ok]
+    for s in np.unique(g):
+        cities[s] = np.union1d(cities.get(s, np.empty(0, dtype=np.uint64)), hashes[g == s])
+
+
+def stream_state_metrics(sources: dict, dim: StateDim, chunk_rows: int = CHUNK_ROWS,
+                         sketch_size: int = SKETCH_SIZE) -> pd.DataFrame:
+    """sources: archivo lógico -> ruta, archivo binario o DataFrame. Mismas columnas que `state_rollup`."""
+    S = len(dim)
+    stats = {}        # columna -> RunningStats
+    cities = {}       # state_id -> hashes (uint64) de ciudades distintas: 8 bytes por localidad, no por fila
+    for source, src in sources.items():
+        if src is None:
+            continue
+        chunks, columns = _read_chunks(src, chunk_rows)
+        state_col = _first(columns, STATE_COLS)
+        if state_col is None and "state_id" not in columns:
+            continue
+        city_col, weight_col = _first(columns, CITY_COLS), _first(columns, WEIGHT_COLS)
+        metrics = {col: _first(columns, spec.candidates) for col, spec in CITY_METRICS.items()
+                   if spec.source == source and _first(columns, spec.candidates) is not None}
+        for chunk in chunks:
+            if "state_id" in columns:
+                ids = chunk["state_id"].to_numpy(dtype=np.intp)
+            else:
+                ids = dim.encode(chunk[columns[state_col]])
+            weights = parse_numeric(chunk[columns[weight_col]]) if weight_col else None
+            for col, src_col in metrics.items():
+                if col not in stats:
+                    stats[col] = RunningStats(S, sketch_size)
+                stats[col].update(ids, parse_numeric(chunk[columns[src_col]]), weights)
+            names = (chunk[columns[city_col]].astype("string").str.strip() if city_col
+                     else pd.Series(pd.NA, index=chunk.index, dtype="string"))
+            _add_cities(cities, ids, names)
+
+    out = {
+        "state_id": np.arange(S),
+        "state": dim.codes,
+        "state_name": dim.names,
+        "n_cities": np.array([len(cities.get(s, ())) for s in range(S)], dtype=np.int64),
+    }
+    for col in CITY_METRICS:
+        if col not in stats:
+            continue
+        s = stats[col].finish()
+        out[col] = s[CITY_METRICS[col].stat]
+        out[f"{col}_median"] = s["median"]
+        out[f"{col}_mean"] = s["mean"]
+        out[f"{col}_n"] = s["n_valid"]
+        if "weighted_mean" in s:
+            out[f"{col}_weighted"] = s["weighted_mean"]
+    return pd.DataFrame(out)
+
+
+def load_streamed_metrics(sources: dict, dim: StateDim, key) -> pd.DataFrame:
+    """Rollup en streaming guardado en Feather para `key` (versión de datos); sin `key` solo se calcula."""
+    if not key:
+        return stream_state_metrics(sources, dim)
+    path = cache_path(f"streamrollup-{content_hash(repr((STREAM_VERSION, key)).encode())}")
+    if path.exists():
+        try:
+            return feather.read_table(path).to_pandas()
+        except Exception:
+            path.unlink(missing_ok=True)
+    df = stream_state_metrics(sources, dim)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        feather.write_feather(df, tmp, compression="uncompressed")
+        os.replace(tmp, path)
+    except OSError:
+        pass
+    return df
+
+
+def should_stream(path, threshold: int = STREAM_THRESHOLD) -> bool:
+    """True si el archivo supera el umbral de streaming; False si no se puede leer su tamaño."""
+    try:
+        return os.path.getsize(path) > threshold
+    except OSError:
+        return False
@@ -0,0 +1,274 @@
+# analytics/tables.py
+"""Tabla detrás de cada gráfica del dashboard (funciones puras sobre `Dataset`).
+
+El dashboard solo dibuja lo que regresan estas funciones; la CLI las escribe a
+disco para servir resultados precalculados.
+"""
+import numpy as np
+import pandas as pd
+
+from .acs import CITY_METRICS
+from .cohorts import Cohort, CohortIndex
+from .dataset import Dataset
+from .timeseries import rolling_mean
+
+# Perfiles demográficos fijos del tab 3: (id, género, raza, edad mín, edad máx, etiqueta)
+DEMO_PROFILES = (
+    ("white_male_25_40", "M", "W", 25, 40, "White male 25–40"),
+    ("black_female_25_40", "F", "B", 25, 40, "Black female 25–40"),
+)
+# Los mismos perfiles como cohortes iniciales del constructor de cohortes
+DEFAULT_COHORTS = tuple(Cohort(label, gender=(g,), race=(r,), age_min=lo, age_max=hi)
+                        for _, g, r, lo, hi, label in DEMO_PROFILES)
+
+
+def add_rates(ds: Dataset, df_counts: pd.DataFrame, count_col="count", dropna=False) -> pd.DataFrame:
+    """Población 2015 y tasa por millón por búsqueda en la dimensión de estados."""
+    if "state_id" not in df_counts.columns:
+        df_counts = df_counts.assign(state_id=ds.dim.encode(df_counts[ds.state_col]))
+    return ds.dim.add_rates(df_counts, count_col, dropna=dropna)
+
+
+def _counts(ds: Dataset, df, count_col, use_rates, dropna):
+    return add_rates(ds, df, count_col, dropna) if use_rates else ds.dim.label(df)
+
+
+def cities_by_state(ds: Dataset, year) -> pd.DataFrame:
+    return (ds.cube.state_counts("cities", year, ds.state_col, "num_cities")
+              .sort_values("num_cities", ascending=False))
+
+
+def mental_deaths_by_state(ds: Dataset, year, use_rates=True, dropna=False) -> pd.DataFrame | None:
+    if "signs_of_mental_illness" not in ds.pk.columns:
+        return None
+    deaths = (ds.cube.state_counts("mental", year, ds.state_col, "num_deaths")
+                .sort_values("num_deaths", ascending=False))
+    return _counts(ds, deaths, "num_deaths", use_rates, dropna)
+
+
+def metric_vs_mental_deaths(ds: Dataset, year, metric, use_rates=True, dropna=False) -> pd.DataFrame | None:
+    """Muertes (o tasa) por salud mental + una métrica estatal por ciudad (ingreso, pobreza…)."""
+    deaths = mental_deaths_by_state(ds, year, use_rates, dropna)
+    if deaths is None or not ds.has_metric(metric):
+        return None
+    return deaths.assign(**{metric: ds.metric_by_state(deaths, metric)})
+
+
+def top_weapons(ds: Dataset, year) -> pd.DataFrame | None:
+    if "armed" not in ds.pk.columns:
+        return None
+    return ds.cube.armed_counts(year)
+
+
+def toy_by_state(ds: Dataset, year, use_rates=True, dropna=False) -> pd.DataFrame | None:
+    if "armed" not in ds.pk.columns:
+        return None
+    toy = ds.cube.state_counts("toy", year, ds.state_col, "num_incidents")
+    y_col = "rate_per_million" if use_rates else "num_incidents"
+    return _counts(ds, toy, "num_incidents", use_rates, dropna).sort_values(y_col, ascending=False)
+
+
+def weapon_classes_by_state(ds: Dataset, year, top_n=None) -> pd.DataFrame | None:
+    """Incidentes por estado y clase de arma, estados de mayor a menor total (solo `top_n` si se pide)."""
+    if "armed" not in ds.pk.columns:
+        return None
+    out = ds.dim.label(ds.cube.class_counts(year, ds.state_col))
+    totals = out.groupby("state_id")["count"].sum().sort_values(ascending=False, kind="stable")
+    if top_n is not None:
+        totals = totals.head(top_n)
+    rank = pd.Series(np.arange(len(totals)), index=totals.index)
+    out = out.assign(_rank=out["state_id"].map(rank)).dropna(subset=["_rank"])
+    return out.sort_values("_rank", kind="stable").drop(columns="_rank")
+
+
+def race_denominator(ds: Dataset, races=()) -> np.ndarray | None:
+    """(S,) población de las razas dadas (ShareRaceByCity2 × población 2015); None si no aplica."""
+    if not races or ds.race_population is None:
+        return None
+    return ds.race_population.denominator(races)
+
+
+def _rate_on(df: pd.DataFrame, denominator: np.ndarray, dropna: bool) -> pd.DataFrame:
+    """Reemplaza la tasa por millón usando otro denominador por estado (división vectorizada)."""
+    out = df.assign(race_population=denominator[df["state_id"].to_numpy()])
+    out["rate_per_million"] = out["count"].to_numpy() / out["race_population"].to_numpy() * 1_000_000
+    return out[out["race_population"].notna()] if dropna else out
+
+
+def rate_by_demo(ds: Dataset, year, gender_code, race_code, age_min, age_max, label,
+                 dropna=False, by_race=True) -> pd.DataFrame | None:
+    """Tasa por millón por estado para un perfil género × raza × edad (rebanada del cubo).
+
+    Con `by_race` (y ShareRaceByCity2 cargado) el denominador es la población de esa raza.
+    """
+    if not all(c in ds.pk.columns for c in ("gender", "race", "age")):
+        return None
+    out = ds.cube.demo_counts(year, gender_code, race_code, age_min, age_max, ds.state_col, "count")
+    if out.empty:
+        return None
+    out = add_rates(ds, out, "count", dropna)
+    denominator = race_denominator(ds, (race_code,)) if by_race else None
+    if denominator is not None:
+        out = _rate_on(out, denominator, dropna)
+    out["label"] = label
+    return out.sort_values("rate_per_million", ascending=False)
+
+
+def cohort_rates(ds: Dataset, index: CohortIndex, cohorts, year=None, dropna=False,
+                 by_race=True) -> pd.DataFrame:
+    """Conteo y tasa por millón por estado para varias cohortes (una fila por cohorte × estado con incidentes).
+
+    Con `by_race`, las cohortes filtradas por raza se dividen entre la población de
+    esas razas (columna `denominator`); las demás, entre la población total del estado.
+    """
+    parts = []
+    for cohort in cohorts:
+        values = index.state_counts(cohort, year)
+        denominator = race_denominator(ds, cohort.race) if by_race else None
+        if denominator is None:
+            denominator = ds.dim.population
+        keep = np.flatnonzero(values > 0)
+        parts.append(pd.DataFrame({"cohort": cohort.label, ds.state_col: ds.dim.codes[keep], "state_id": keep,
+                                   "count": values[keep], "denominator": denominator[keep]}))
+    if not parts:
+        return pd.DataFrame(columns=["cohort", ds.state_col, "state_id", "count", "denominator",
+                                     "state_name", "rate_per_million"])
+    out = ds.dim.label(pd.concat(parts, ignore_index=True))
+    out["rate_per_million"] = out["count"].to_numpy() / out["denominator"].to_numpy() * 1_000_000
+    return out[out["denominator"].notna()] if dropna else out
+
+
+# métrica del mapa -> (etiqueta, admite tasa por millón)
+MAP_METRICS = {
+    "total": ("Incidentes", True),
+    "cities": ("Ciudades con tiroteo", False),
+    "mental": ("Muertes con indicios de enfermedad mental", True),
+    "toy": ("Incidentes con 'toy weapon'", True),
+    "cohort": ("Tasa de cohorte (por millón)", False),
+    "median_income": ("Ingreso mediano 2015 (USD)", False),
+}
+
+
+def map_metrics(ds: Dataset) -> list:
+    """Métricas del mapa disponibles con los archivos cargados."""
+    needs = {"mental": "signs_of_mental_illness" in ds.pk.columns, "toy": "armed" in ds.pk.columns,
+             "median_income": ds.has_metric("median_income")}
+    return [m for m in MAP_METRICS if needs.get(m, True)]
+
+
+def state_vector(ds: Dataset, metric, year, use_rates=True, index: CohortIndex | None = None,
+                 cohort: Cohort | None = None, by_race=True) -> np.ndarray:
+    """(S,) valor por estado alineado con `ds.dim.codes` (NaN = sin dato), listo para el mapa."""
+    if metric == "cohort":
+        if index is None or cohort is None:
+            raise ValueError("La métrica 'cohort' requiere índice y cohorte.")
+        denominator = race_denominator(ds, cohort.race) if by_race else None
+        if denominator is None:
+            denominator = ds.dim.population
+        return index.state_counts(cohort, year) / denominator * 1_000_000
+    if ds.state_metrics is not None and metric in ds.state_metrics.columns:
+        return ds.state_metrics[metric].to_numpy(dtype=float)
+    values = ds.cube.state_values(metric, year).astype(float)
+    if use_rates and MAP_METRICS[metric][1]:
+        values = values / ds.dim.population * 1_000_000
+    return values
+
+
+def state_summary(ds: Dataset, year, use_rates=True, dropna=False) -> pd.DataFrame:
+    """Una fila por estado con los conteos de fig1–fig4 (y su tasa por millón si `use_rates`)."""
+    metrics = ["cities", "total"] + [m for m, col in (("mental", "signs_of_mental_illness"), ("toy", "armed"))
+                                     if col in ds.pk.columns]
+    out = pd.DataFrame({ds.state_col: ds.dim.codes, "state_id": np.arange(len(ds.dim)),
+                        **{m: ds.cube.state_values(m, year) for m in metrics}})
+    out = ds.dim.add_rates(out, "total", dropna=dropna).drop(columns="rate_per_million")
+    if use_rates:
+        for m in metrics[1:]:
+            out[f"{m}_rate_per_million"] = out[m].to_numpy() / out["population_2015"].to_numpy() * 1_000_000
+    return out.sort_values("total", ascending=False, ignore_index=True)
+
+
+def city_drilldown(ds: Dataset, state_id, year) -> pd.DataFrame | None:
+    """Ciudades de un estado con incidentes en `year` + métricas ACS de la ciudad emparejada.
+
+    Los conteos salen de las llaves de ciudad del cubo y cada ciudad se une a
+    `city_table` por búsqueda en el índice (sin merge ni recorrer las ~29k filas).
+    """
+    if ds.city_col is None or ds.cube.city_keys is None:
+        return None
+    cities, counts = ds.cube.city_counts_in(year, state_id)
+    out = pd.DataFrame({"city": cities, "incidents": counts})
+    if ds.city_index is None:
+        return out.sort_values("incidents", ascending=False, ignore_index=True)
+    rows = ds.city_index.lookup_many(np.full(len(cities), state_id), cities)
+    hit = rows >= 0
+    out["acs_city"] = np.where(hit, ds.city_table.city[np.where(hit, rows, 0)], None)
+    out["match"] = [ds.city_index.methods.get((int(state_id), c), "sin pareja") for c in cities]
+    for col, values in ds.city_table.values.items():
+        out[col] = np.where(hit, values[np.where(hit, rows, 0)], np.nan)
+    return out.sort_values(["incidents", "city"], ascending=[False, True], ignore_index=True)
+
+
+def city_columns(df: pd.DataFrame) -> dict:
+    """Encabezados legibles para la tabla de ciudades."""
+    names = {"city": "Ciudad", "incidents": "Incidentes", "acs_city": "Ciudad ACS", "match": "Emparejamiento"}
+    names.update({c: spec.label for c, spec in CITY_METRICS.items()})
+    return {c: names[c] for c in df.columns if c in names}
+
+
+def share_black_vs_deaths(ds: Dataset, year) -> pd.DataFrame | None:
+    if not ds.has_metric("share_black"):
+        return None
+    out = ds.dim.label(ds.cube.state_counts("total", year, ds.state_col, "num_deaths"))
+    out["share_black"] = ds.metric_by_state(out, "share_black")
+    return out
+
+
+def range_by_state(ds: Dataset, start, end, metric="total", use_rates=True, dropna=False) -> pd.DataFrame:
+    """Conteo (o tasa) por estado en un rango de fechas libre, desde la serie acumulada."""
+    values = ds.series.range_counts(start, end, metric)
+    keep = np.flatnonzero(values > 0)
+    out = pd.DataFrame({ds.state_col: ds.dim.codes[keep], "state_id": keep, "count": values[keep]})
+    y_col = "rate_per_million" if use_rates else "count"
+    return _counts(ds, out, "count", use_rates, dropna).sort_values(y_col, ascending=False)
+
+
+def time_series(ds: Dataset, start, end, freq="M", window=1, metric="total", use_rates=True,
+                states=None, dropna=False) -> pd.DataFrame:
+    """Serie larga (periodo × estado) mensual ('M') o semanal ('W') con promedio móvil de `window` periodos."""
+    periods, counts = ds.series.binned(start, end, freq, metric)
+    values = rolling_mean(counts, window)
+    if use_rates:
+        values = values / ds.dim.population * 1_000_000
+    ids = np.arange(len(ds.dim)) if states is None else ds.dim.encode(pd.Series(list(states), dtype=object))
+    ids = ids[ids >= 0]
+    if dropna and use_rates:
+        ids = ids[~np.isnan(ds.dim.population[ids])]
+    return pd.DataFrame({
+        "period": np.repeat(periods, len(ids)),
+        ds.state_col: np.tile(ds.dim.codes[ids], len(periods)),
+        "state_id": np.tile(ids, len(periods)),
+        "value": values[:, ids].ravel(),
+    })
+
+
+def chart_tables(ds: Dataset, year, top_n, use_rates=True, dropna=False) -> dict:
+    """Todas las tablas del dashboard para un juego de controles; barras ya truncadas a `top_n`."""
+    tables = {
+        "fig1_cities_by_state": cities_by_state(ds, year).head(top_n),
+        "fig2_mental_deaths_by_state": _head(mental_deaths_by_state(ds, year, use_rates, dropna), top_n),
+        "fig3_top_weapons": _head(top_weapons(ds, year), top_n),
+        "fig3b_weapon_classes_by_state": weapon_classes_by_state(ds, year, top_n),
+        "fig4_toy_weapon_by_state": _head(toy_by_state(ds, year, use_rates, dropna), top_n),
+        "fig7_share_black_vs_deaths": share_black_vs_deaths(ds, year),
+    }
+    tables["fig2b_median_income_vs_mental_deaths"] = metric_vs_mental_deaths(ds, year, "median_income",
+                                                                             use_rates, dropna)
+    for metric in ("poverty_rate", "percent_completed_hs"):
+        tables[f"fig2c_{metric}_vs_mental_deaths"] = metric_vs_mental_deaths(ds, year, metric, use_rates, dropna)
+    for i, (name, g, r, lo, hi, label) in enumerate(DEMO_PROFILES, start=5):
+        tables[f"fig{i}_{name}"] = _head(rate_by_demo(ds, year, g, r, lo, hi, label, dropna), top_n)
+    return {k: v for k, v in tables.items() if v is not None}
+
+
+def _head(df, n):
+    return None if df is None else df.head(n)
@@ -0,0 +1,147 @@
+# analytics/timeseries.py
+"""Serie diaria por estado con sumas acumuladas, para consultas por rango de fechas.
+
+Los incidentes se agrupan una vez en cubetas diarias (día × estado) y se guarda
+la suma acumulada. Un rango [inicio, fin] cuesta dos búsquedas binarias y una
+resta; meses y semanas son restas entre los bordes de cada periodo, sin filtrar
+ni copiar `pk` en cada interacción.
+"""
+from dataclasses import dataclass, replace
+
+import numpy as np
+import pandas as pd
+
+from .states import StateDim
+
+FREQS = {"M": "mensual", "W": "semanal"}
+METRICS = ("total", "mental")
+MONDAY = np.datetime64("1970-01-05")   # las semanas empiezan en lunes
+
+
+def _days(values) -> np.ndarray:
+    return np.asarray(values, dtype="datetime64[D]")
+
+
+def _week_start(day):
+    """Lunes de la semana de `day`."""
+    return MONDAY + ((day - MONDAY) // 7) * 7
+
+
+def _daily(df: pd.DataFrame, date_col: str):
+    """(días, state_id, salud mental) de las filas con fecha y estado válidos."""
+    ids = df["state_id"].to_numpy()
+    dates = df[date_col]
+    valid = dates.notna().to_numpy() & (ids >= 0)
+    days = _days(dates[valid].to_numpy())
+    if "signs_of_mental_illness" in df.columns:
+        mental = df["signs_of_mental_illness"].fillna(False).to_numpy(dtype=bool)[valid]
+    else:
+        mental = np.zeros(valid.sum(), dtype=bool)
+    return days, ids[valid].astype(np.intp), mental
+
+
+def rolling_mean(counts: np.ndarray, window: int) -> np.ndarray:
+    """Promedio móvil sobre el eje 0 con sumas acumuladas; los primeros periodos usan ventana parcial."""
+    window = max(int(window), 1)
+    if window == 1:
+        return counts.astype(float)
+    c = np.concatenate([np.zeros((1,) + counts.shape[1:]), np.cumsum(counts, axis=0)])
+    hi = np.arange(1, len(counts) + 1)
+    lo = np.maximum(hi - window, 0)
+    width = (hi - lo).reshape((-1,) + (1,) * (counts.ndim - 1))
+    return (c[hi] - c[lo]) / width
+
+
+@dataclass(frozen=True)
+class DailySeries:
+    days: np.ndarray         # (D,) datetime64[D] contiguos, del primer al último incidente
+    states: np.ndarray       # (S,) alineado con `StateDim`
+    cum_total: np.ndarray    # (D + 1, S) incidentes acumulados antes de cada día
+    cum_mental: np.ndarray   # (D + 1, S) ídem con signs_of_mental_illness
+
+    @property
+    def date_range(self):
+        """(primer, último) día como `datetime.date`, para los controles de fecha."""
+        if not len(self.days):
+            return None, None
+        return self.days[0].astype(object), self.days[-1].astype(object)
+
+    def _bounds(self, start, end):
+        lo = np.searchsorted(self.days, _days(start), side="left")
+        hi = np.searchsorted(self.days, _days(end), side="right")
+        return int(lo), int(max(hi, lo))
+
+    def _cum(self, metric):
+        if metric not in METRICS:
+            raise KeyError(f"Métrica de serie desconocida: {metric}")
+        return self.cum_total if metric == "total" else self.cum_mental
+
+    def range_counts(self, start, end, metric="total") -> np.ndarray:
+        """Conteo por estado en [start, end] (inclusive): dos búsquedas binarias y una resta."""
+        cum = self._cum(metric)
+        lo, hi = self._bounds(start, end)
+        return cum[hi] - cum[lo]
+
+    def binned(self, start, end, freq="M", metric="total"):
+        """(inicio de cada periodo, conteos (B, S)) para meses ('M') o semanas de lunes ('W')."""
+        if freq not in FREQS:
+            raise KeyError(f"Periodo desconocido: {freq}")
+        cum = self._cum(metric)
+        start, end = _days(start), _days(end)
+        if end < start:
+            return np.array([], dtype="datetime64[D]"), np.zeros((0, len(self.states)), dtype=cum.dtype)
+        if freq == "M":
+            periods = np.arange(start.astype("datetime64[M]"), end.astype("datetime64[M]") + 1)
+            periods = periods.astype("datetime64[D]")
+        else:
+            periods = np.arange(_week_start(start), end + 1, 7)
+        # el primer y último periodo se recortan al rango pedido
+        edges = np.concatenate([_days([start]), periods[1:], _days([end + 1])])
+        idx = np.searchsorted(self.days, edges, side="left")
+        return periods, np.diff(cum[idx], axis=0)
+
+    # ---------- actualización incremental ----------
+    def update(self, added: pd.DataFrame, removed: pd.DataFrame, date_col: str) -> "DailySeries":
+        """Serie nueva con `added` sumado y `removed` restado; el rango de días crece si hace falta."""
+        days_a, s_a, m_a = _daily(added, date_col)
+        days_r, s_r, m_r = _daily(removed, date_col)
+        new_days = np.concatenate([days_a, days_r])
+        if not len(new_days):
+            return self
+        first = min(self.days[0], new_days.min()) if len(self.days) else new_days.min()
+        last = max(self.days[-1], new_days.max()) if len(self.days) else new_days.max()
+        days = np.arange(first, last + 1)
+        offset = int((self.days[0] - first).astype(int)) if len(self.days) else 0
+
+        d_a, d_r = (days_a - first).astype(int), (days_r - first).astype(int)
+
+        def rebuild(cum, keep_a, keep_r):
+            # el costo es O(días × estados), independiente del número de incidentes
+            counts = np.zeros((len(days), len(self.states)), dtype=np.int64)
+            counts[offset:offset + len(self.days)] = np.diff(cum, axis=0)
+            np.add.at(counts, (d_a[keep_a], s_a[keep_a]), 1)
+            np.add.at(counts, (d_r[keep_r], s_r[keep_r]), -1)
+            return np.concatenate([np.zeros((1, len(self.states)), dtype=np.int64), counts.cumsum(axis=0)])
+
+        return replace(self, days=days,
+                       cum_total=rebuild(self.cum_total, slice(None), slice(None)),
+                       cum_mental=rebuild(self.cum_mental, m_a, m_r))
+
+
+def build_daily_series(pk: pd.DataFrame, date_col: str, dim: StateDim) -> DailySeries:
+    """Cubetas diarias (día × estado) y sus sumas acumuladas; requiere `pk['state_id']`."""
+    days, s_codes, mental = _daily(pk, date_col)
+    S = len(dim)
+    if not len(days):
+        empty = np.zeros((1, S), dtype=np.int64)
+        return DailySeries(np.array([], dtype="datetime64[D]"), dim.codes, empty, empty.copy())
+    first = days.min()
+    d_codes = (days - first).astype(int)
+    D = int(d_codes.max()) + 1
+    flat = d_codes * S + s_codes
+    total = np.bincount(flat, minlength=D * S).reshape(D, S)
+    mental_counts = np.bincount(flat[mental], minlength=D * S).reshape(D, S)
+    zero = np.zeros((1, S), dtype=np.int64)
+    return DailySeries(days=np.arange(first, first + D), states=dim.codes,
+                       cum_total=np.concatenate([zero, total.cumsum(axis=0)]),
+                       cum_mental=np.concatenate([zero, mental_counts.cumsum(axis=0)]))
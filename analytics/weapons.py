@@ -0,0 +1,94 @@
+# analytics/weapons.py
+"""Taxonomía de armas: cada texto distinto de `armed` se clasifica una sola vez.
+
+`armed` es texto libre ("gun", "toy weapon", "gun and knife", "box cutter"…).
+La clasificación se memoriza por valor distinto, así que su costo depende del
+número de etiquetas (decenas), no de filas; el cubo la aplica sobre su eje de
+armas y los conteos por clase salen de sumar columnas.
+
+`classify` da una sola clase por etiqueta (las compuestas son 'multi'; suman el
+total). `includes_matrix` responde "¿el incidente involucra esta clase?": una
+etiqueta como "toy weapon and knife" cuenta en 'toy', 'blade' y 'multi'.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+
+# orden fijo: el índice en esta tupla es el código de clase
+WEAPON_CLASSES = ("firearm", "blade", "vehicle", "toy", "unarmed", "other", "multi", "unknown")
+
+CLASS_LABELS = {
+    "firearm": "Arma de fuego",
+    "blade": "Arma blanca",
+    "vehicle": "Vehículo",
+    "toy": "Juguete / réplica",
+    "unarmed": "Desarmado",
+    "other": "Otro objeto",
+    "multi": "Varias armas",
+    "unknown": "Desconocido",
+}
+
+UNKNOWN_TEXT = {"", "nan", "none", "unknown", "undetermined", "unknown weapon"}
+# palabras clave por clase (se comparan contra palabras completas)
+KEYWORDS = {
+    "toy": {"toy", "replica", "airsoft", "bb", "pellet"},
+    "unarmed": {"unarmed"},
+    "vehicle": {"vehicle", "car", "truck", "motorcycle", "carjack", "suv", "van"},
+    "firearm": {"gun", "guns", "rifle", "pistol", "shotgun", "revolver", "handgun", "firearm"},
+    "blade": {"knife", "knives", "machete", "sword", "ax", "axe", "hatchet", "cutter", "scissors",
+              "razor", "bayonet", "cleaver", "shard", "spear", "pick-axe", "blade", "saw", "sharp",
+              "dagger", "pitchfork"},
+}
+# "gun" que no es arma de fuego
+NOT_FIREARM = {"nail gun", "bean-bag gun", "staple gun", "glue gun"}
+SPLIT = re.compile(r"\s+and\s+|\s*[,/&+]\s*")
+
+
+def _part_class(part: str) -> str:
+    if part in UNKNOWN_TEXT:
+        return "unknown"
+    if part in NOT_FIREARM:
+        return "other"
+    words = set(re.findall(r"[a-z][a-z'-]*", part))
+    for cls in ("toy", "unarmed", "vehicle", "firearm", "blade"):
+        if words & KEYWORDS[cls]:
+            return cls
+    return "other"
+
+
+@lru_cache(maxsize=4096)
+def classify(label) -> str:
+    """Clase de un texto de `armed`; combinaciones de clases distintas son 'multi'."""
+    text = str(label).strip().lower()
+    if text in UNKNOWN_TEXT:
+        return "unknown"
+    found = {_part_class(p) for p in SPLIT.split(text) if p} - {"unknown"}
+    if not found:
+        return "unknown"
+    return found.pop() if len(found) == 1 else "multi"
+
+
+@lru_cache(maxsize=4096)
+def classes_in(label) -> frozenset:
+    """Clases que aparecen en un texto de `armed`: la de `classify` más la de cada parte."""
+    text = str(label).strip().lower()
+    parts = set() if text in UNKNOWN_TEXT else {_part_class(p) for p in SPLIT.split(text) if p} - {"unknown"}
+    return frozenset(parts | {classify(label)})
+
+
+def class_codes(labels) -> np.ndarray:
+    """(A,) código en `WEAPON_CLASSES` para cada etiqueta de arma."""
+    index = {c: i for i, c in enumerate(WEAPON_CLASSES)}
+    return np.array([index[classify(label)] for label in labels], dtype=np.intp)
+
+
+def class_matrix(labels) -> np.ndarray:
+    """(A, K) indicadora etiqueta -> clase; `conteos (…, A) @ matriz` da conteos por clase."""
+    return (class_codes(labels)[:, None] == np.arange(len(WEAPON_CLASSES))).astype(np.int64)
+
+
+def includes_matrix(labels) -> np.ndarray:
+    """(A, K) multi-hot etiqueta -> clases que contiene; una etiqueta compuesta cuenta en cada una."""
+    return np.array([[c in classes_in(label) for c in WEAPON_CLASSES] for label in labels],
+                    dtype=np.int64).reshape(len(labels), len(WEAPON_CLASSES))
@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Benchmarks reproducibles sobre los CSV incluidos en el repo."""
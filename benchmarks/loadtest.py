@@ -0,0 +1,139 @@
+# benchmarks/loadtest.py
+"""Prueba de carga de la API JSON contra los CSV incluidos.
+
+    python -m benchmarks.loadtest --concurrency 32 --requests 5000
+    python -m benchmarks.loadtest --url http://127.0.0.1:8765 --duration 30
+
+Sin `--url` levanta `python -m analytics serve` en un puerto libre y lo apaga al
+terminar. Cada cliente es una conexión keep-alive (asyncio puro) que recorre una
+mezcla de rutas con parámetros variados; se reporta req/s, latencias p50/p95/p99,
+códigos de estado y proporción de aciertos de caché (cabecera X-Cache).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def request_mix(years=(2015, 2016, 2017), seed: int = 0) -> list:
+    """Rutas como las que pediría un consumidor: varios años, top N, tasas y cohortes."""
+    rng = random.Random(seed)
+    paths = []
+    for year in years:
+        for use_rates in ("true", "false"):
+            paths.append(f"/states?year={year}&use_rates={use_rates}")
+            for top_n in (5, 10, 20):
+                paths.append(f"/charts/fig1_cities_by_state?year={year}&top_n={top_n}")
+                paths.append(f"/charts/fig4_toy_weapon_by_state?year={year}&top_n={top_n}&use_rates={use_rates}")
+        paths.append(f"/weapons?year={year}&top_n=10")
+        paths.append(f"/map?year={year}&metric=total")
+        paths.append(f"/correlations?year={year}")
+    for _ in range(40):
+        lo = rng.randrange(15, 60, 5)
+        paths.append(f"/cohort?year={rng.choice(years)}&gender={rng.choice('MF')}"
+                     f"&race={rng.choice('WBHAN')}&age_min={lo}&age_max={lo + rng.choice((5, 10, 20))}")
+    rng.shuffle(paths)
+    return paths
+
+
+async def client(host, port, paths, deadline, budget, stats):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for path in paths:
+            if time.perf_counter() > deadline or next(budget) <= 0:
+                break
+            t0 = time.perf_counter()
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            headers = {k.lower(): v.strip() for k, _, v in (line.partition(":") for line in lines[1:] if line)}
+            await reader.readexactly(int(headers["content-length"]))
+            stats["latency"].append(time.perf_counter() - t0)
+            status = lines[0].split(" ")[1]
+            stats["status"][status] = stats["status"].get(status, 0) + 1
+            stats["hits"] += headers.get("x-cache") == "hit"
+    finally:
+        writer.close()
+
+
+async def run(url, concurrency, n_requests, duration, seed):
+    parts = urlsplit(url)
+    mix = request_mix(seed=seed)
+    stats = {"latency": [], "status": {}, "hits": 0}
+    remaining = itertools.count(n_requests or sys.maxsize, -1)
+    deadline = time.perf_counter() + (duration or float("inf"))
+    t0 = time.perf_counter()
+    # cada cliente recorre la mezcla desde un punto distinto, en ciclo
+    await asyncio.gather(*(client(parts.hostname, parts.port,
+                                  itertools.islice(itertools.cycle(mix), i * 7 % len(mix), None),
+                                  deadline, remaining, stats)
+                           for i in range(concurrency)))
+    return stats, time.perf_counter() - t0
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int) -> subprocess.Popen:
+    proc = subprocess.Popen([sys.executable, "-m", "analytics", "serve", "--port", str(port)], cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=os.environ.copy())
+    line = proc.stdout.readline()   # el servidor imprime una línea cuando el dataset ya está en memoria
+    if not line.startswith("API en"):
+        proc.kill()
+        raise RuntimeError(f"No arrancó la API: {line}{proc.stdout.read()}")
+    return proc
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__.splitlines()[0])
+    p.add_argument("--url", help="API ya levantada (default: se levanta una en un puerto libre)")
+    p.add_argument("--concurrency", type=int, default=32)
+    p.add_argument("--requests", type=int, default=5000, help="total de peticiones (0 = sin límite)")
+    p.add_argument("--duration", type=float, default=0, help="segundos (0 = sin límite)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="guarda el resumen en JSON")
+    args = p.parse_args(argv)
+
+    proc = None
+    url = args.url
+    if url is None:
+        port = free_port()
+        proc = start_server(port)
+        url = f"http://127.0.0.1:{port}"
+    try:
+        stats, elapsed = asyncio.run(run(url, args.concurrency, args.requests, args.duration, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    lat = sorted(stats["latency"])
+    n = len(lat)
+    pct = lambda q: lat[min(n - 1, int(q * n))] * 1000 if n else float("nan")  # noqa: E731
+    summary = {"url": url, "concurrency": args.concurrency, "requests": n, "seconds": round(elapsed, 3),
+               "req_per_s": round(n / elapsed, 1) if elapsed else None,
+               "p50_ms": round(pct(0.50), 3), "p95_ms": round(pct(0.95), 3), "p99_ms": round(pct(0.99), 3),
+               "mean_ms": round(statistics.fmean(lat) * 1000, 3) if n else None,
+               "status": stats["status"], "cache_hit_ratio": round(stats["hits"] / n, 3) if n else None}
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
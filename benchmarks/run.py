@@ -0,0 +1,206 @@
+# benchmarks/run.py
+"""Benchmark por etapa (carga, normalización, agregación, render) a varias escalas.
+
+    python -m benchmarks.run --scales 1 10 100 --out bench.json
+    python -m benchmarks.run compare base.json head.json
+
+Cada resultado es un registro JSON con etapa, escala, filas, tiempo (mín/mediana
+de `--repeat` corridas) y memoria pico (tracemalloc, corrida aparte), más el
+commit de git, para comparar regresiones entre versiones.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# caché de ingesta aislada: las corridas "cold" no deben ver Feathers de otras sesiones.
+# Temporal y borrada al salir: a escala 100×/1000× los Feathers ocupan GB
+if "DASHBOARD_CACHE_DIR" not in os.environ:
+    _cache_dir = tempfile.TemporaryDirectory(prefix="bench-ingest-")
+    os.environ["DASHBOARD_CACHE_DIR"] = _cache_dir.name
+
+import pandas as pd  # noqa: E402
+
+from analytics import ingest, tables  # noqa: E402
+from analytics.acs import build_state_metrics  # noqa: E402
+from analytics.stream import stream_state_metrics  # noqa: E402
+from analytics.dataset import CITY_SOURCES, build_dataset, prepare_incidents  # noqa: E402
+from benchmarks import synth  # noqa: E402
+
+DATE_FORMAT = "%m/%d/%Y"
+
+
+def measure(fn, repeat):
+    """(mín, mediana) de tiempo en segundos y pico de memoria en MB."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), statistics.median(times), peak / 2**20
+
+
+def legacy_norm_cols(df):
+    """Copia + normalización de columnas, como hacía `norm_cols` en las apps."""
+    df = df.copy()
+    df.columns = (df.columns.str.strip()
+                    .str.replace(r"\s+", "_", regex=True)
+                    .str.replace(r"[^\w_]", "", regex=True)
+                    .str.lower())
+    return df
+
+
+def legacy_groupbys(pk, date_col, year):
+    """Los groupby por rerun de los tabs 1–3 antes del cubo."""
+    pk_year = pk[pk[date_col].dt.year == year].copy()
+    pk_year.groupby("state", observed=True)["city"].nunique()
+    pk_year[pk_year["signs_of_mental_illness"] == True].groupby("state", observed=True).size()  # noqa: E712
+    armed = pk_year["armed"].astype(str).str.lower()
+    armed.str.strip().value_counts()
+    pk_year[armed.str.contains(r"\btoy\b", na=False)].groupby("state", observed=True).size()
+    pk_year.groupby("state", observed=True).size()
+
+
+def legacy_range_series(pk, date_col, lo, hi):
+    """Filtro booleano + copia + groupby semanal por estado + promedio móvil, por interacción."""
+    sub = pk[(pk[date_col] >= lo) & (pk[date_col] <= hi)].copy()
+    weekly = sub.groupby([pd.Grouper(key=date_col, freq="W-MON"), "state"], observed=True).size()
+    return weekly.unstack(fill_value=0).rolling(4, min_periods=1).mean()
+
+
+def stages(scale):
+    """Genera (nombre, filas, función) para una escala."""
+    pk_bytes = synth.scale_incidents(scale)
+    city_bytes = {k: synth.scale_city_file(k, scale) for k in CITY_SOURCES}
+    pop_bytes = synth.bundled("pop")
+
+    raw_pk = pd.read_csv(io.BytesIO(pk_bytes), low_memory=False)
+    n_pk = len(raw_pk)
+    n_city = sum(len(pd.read_csv(io.BytesIO(b), usecols=[0], encoding="latin-1")) for b in city_bytes.values())
+    frames = {"pk": ingest.load_csv(pk_bytes, "pk"), "pop": ingest.load_csv(pop_bytes)}
+    frames.update({k: ingest.load_csv(b) for k, b in city_bytes.items()})
+    ds = build_dataset(frames)
+    year = ds.years[0]
+    pk_typed, date_col, _, _ = prepare_incidents(frames["pk"])
+    date_text = raw_pk["new_date"]
+
+    def ingest_cold():
+        for kind, b in [("pk", pk_bytes), *city_bytes.items()]:
+            key = ingest.content_hash(b)
+            ingest.cache_path(f"{key}-{kind}" if kind in ingest.SCHEMAS else key).unlink(missing_ok=True)
+            ingest.load_csv(b, kind)
+
+    def ingest_cold_parallel():
+        sources = {"pk": pk_bytes, **city_bytes}
+        for kind, b in sources.items():
+            ingest._feather_path(b, kind).unlink(missing_ok=True)
+        ingest.load_many(sources, workers=max(2, os.cpu_count() or 1))
+
+    def render():
+        import plotly.express as px
+        px.bar(tables.cities_by_state(ds, year).head(10), x="state", y="num_cities").to_json()
+        scatter = tables.share_black_vs_deaths(ds, year)
+        px.scatter(scatter, x="share_black", y="num_deaths", hover_name="state_name").to_json()
+
+    n_all = n_pk + n_city
+    yield "load.read_csv_legacy", n_all, lambda: [pd.read_csv(io.BytesIO(b), low_memory=False, encoding="latin-1")
+                                                  for b in [pk_bytes, *city_bytes.values()]]
+    yield "load.ingest_cold", n_all, ingest_cold
+    # un proceso por archivo (opcional en el dashboard); el pool se levanta en la primera corrida
+    yield "load.ingest_cold_parallel", n_all, ingest_cold_parallel
+    yield "load.ingest_warm", n_all, lambda: [ingest.load_csv(b, k) for k, b in [("pk", pk_bytes), *city_bytes.items()]]
+    yield "normalize.norm_cols_legacy", n_all, lambda: [legacy_norm_cols(raw_pk)] + [
+        legacy_norm_cols(frames[k]) for k in CITY_SOURCES]
+    yield "parse.to_datetime_infer", n_pk, lambda: pd.to_datetime(date_text, errors="coerce")
+    yield "parse.to_datetime_format", n_pk, lambda: pd.to_datetime(date_text, format=DATE_FORMAT, errors="coerce")
+    yield "aggregate.groupby_legacy", n_pk, lambda: legacy_groupbys(pk_typed, date_col, year)
+    yield "aggregate.build_dataset", n_all, lambda: build_dataset(frames)
+    yield "aggregate.city_metrics", n_city, lambda: build_state_metrics(
+        {k: frames[k] for k in CITY_SOURCES}, ds.dim)
+    # del CSV crudo al rollup: carga completa + tabla por ciudad contra bloques con memoria acotada
+    yield "aggregate.city_metrics_full_csv", n_city, lambda: build_state_metrics(
+        {k: ingest.parse_csv(b) for k, b in city_bytes.items()}, ds.dim)
+    yield "aggregate.city_metrics_stream", n_city, lambda: stream_state_metrics(
+        {k: io.BytesIO(b) for k, b in city_bytes.items()}, ds.dim)
+    yield "aggregate.chart_tables", n_pk, lambda: tables.chart_tables(ds, year, 10)
+    lo, hi = pk_typed[date_col].min(), pk_typed[date_col].max()
+    yield "filter.range_groupby_legacy", n_pk, lambda: legacy_range_series(pk_typed, date_col, lo, hi)
+    yield "filter.range_series", n_pk, lambda: tables.time_series(ds, lo, hi, "W", 4)
+    yield "render.plotly", 51, render
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales, repeat, only=None):
+    meta = {"commit": git_commit(), "python": platform.python_version(), "pandas": pd.__version__,
+            "machine": platform.machine(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    results = []
+    for scale in scales:
+        for name, rows, fn in stages(scale):
+            if only and not any(name.startswith(p) for p in only):
+                continue
+            t_min, t_med, peak = measure(fn, repeat)
+            rec = {"stage": name, "scale": scale, "rows": rows, "wall_min_s": round(t_min, 6),
+                   "wall_median_s": round(t_med, 6), "peak_mb": round(peak, 3), "repeat": repeat}
+            results.append(rec)
+            print(f"{name:32s} ×{scale:<5d} {rows:>10,d} filas  {t_med * 1000:10.1f} ms  {peak:9.1f} MB",
+                  file=sys.stderr)
+    return {"meta": meta, "results": results}
+
+
+def compare(base_path, head_path):
+    """Razón head/base por (etapa, escala); > 1 es más lento."""
+    load = lambda p: {(r["stage"], r["scale"]): r for r in json.loads(Path(p).read_text())["results"]}  # noqa: E731
+    base, head = load(base_path), load(head_path)
+    print(f"{'etapa':32s} {'escala':>6s} {'base ms':>10s} {'head ms':>10s} {'razón':>7s} {'MB head':>9s}")
+    for key in sorted(base.keys() & head.keys()):
+        b, h = base[key]["wall_median_s"], head[key]["wall_median_s"]
+        ratio = h / b if b else float("nan")
+        print(f"{key[0]:32s} {key[1]:6d} {b * 1000:10.1f} {h * 1000:10.1f} {ratio:7.2f} {head[key]['peak_mb']:9.1f}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["compare"]:
+        p = argparse.ArgumentParser(prog="python -m benchmarks.run compare")
+        p.add_argument("base")
+        p.add_argument("head")
+        args = p.parse_args(argv[1:])
+        compare(args.base, args.head)
+        return 0
+
+    p = argparse.ArgumentParser(prog="python -m benchmarks.run", description=__doc__.splitlines()[0])
+    p.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                   help="factores de escala (1000 necesita varios GB de RAM)")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--only", nargs="+", help="prefijos de etapa, ej. load aggregate")
+    p.add_argument("--out", default="bench_results.json")
+    args = p.parse_args(argv)
+    report = run(args.scales, args.repeat, args.only)
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"resultados en {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
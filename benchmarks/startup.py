@@ -0,0 +1,107 @@
+# benchmarks/startup.py
+"""Arranque del dashboard: importación y tiempo hasta la primera gráfica.
+
+    python -m benchmarks.startup --repeat 3
+    python -m benchmarks.startup --app app2.py --out startup.json
+
+Cada medición corre en un proceso nuevo (importaciones y cachés de Streamlit son
+por proceso) y ejecuta la primera sesión con `AppTest`, el runner de scripts de
+Streamlit. Modos:
+
+- import: `import dashboard` y si plotly.express quedó cargado.
+- cold:   `streamlit run app.py`; la primera sesión importa, carga y precalcula.
+- warm:   `streamlit run server.py`; eso corre en el arranque (`dashboard.warm`)
+          y la primera sesión solo arma su gráfica.
+
+cold y warm se miden con caché de disco vacía (primer arranque) y llena (reinicio).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODES = ("import", "cold", "warm")
+APPS = ("app.py", "app2.py")
+
+
+def child(mode: str, app: str) -> dict:
+    """Una medición dentro del proceso hijo (tiempos en ms)."""
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest   # el servidor ya tiene Streamlit cargado en ambos modos
+    out = {"streamlit_ms": (time.perf_counter() - t0) * 1000}
+    if mode == "import":
+        t0 = time.perf_counter()
+        import dashboard  # noqa: F401
+        out["import_ms"] = (time.perf_counter() - t0) * 1000
+        out["plotly_express_loaded"] = "plotly.express" in sys.modules
+        return out
+    if mode == "warm":
+        t0 = time.perf_counter()
+        import dashboard
+        dashboard.warm(dashboard.APP if app == "app.py" else dashboard.APP2)
+        out["boot_ms"] = (time.perf_counter() - t0) * 1000
+    t0 = time.perf_counter()
+    at = AppTest.from_file(str(ROOT / app), default_timeout=120).run()
+    out["first_chart_ms"] = (time.perf_counter() - t0) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    out["charts"] = len(at.get("plotly_chart"))
+    return out
+
+
+def measure(mode: str, app: str, cache_dir: str) -> dict:
+    env = {**os.environ, "DASHBOARD_CACHE_DIR": cache_dir,
+           "DASHBOARD_TRACE_LOG": str(Path(cache_dir) / "traces.jsonl")}
+    proc = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child", mode, "--app", app],
+                          cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"falló la medición {mode}:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+def run(app: str, repeat: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as tmp:
+        shared = str(Path(tmp) / "shared")
+        measure("warm", app, shared)   # llena la caché de disco compartida (no se reporta)
+        for mode in MODES:
+            for disk in (("warm",) if mode == "import" else ("cold", "warm")):
+                runs = [measure(mode, app, shared if disk == "warm" else str(Path(tmp) / f"{mode}-{i}"))
+                        for i in range(repeat)]
+                rec = {"mode": mode, "disk": disk, "repeat": repeat}
+                for k in runs[0]:
+                    values = [r[k] for r in runs]
+                    rec[k] = round(statistics.median(values), 1) if isinstance(values[0], float) else values[0]
+                results.append(rec)
+                print(f"{mode:6s} disco {disk:4s}  " + "  ".join(f"{k} {v}" for k, v in rec.items()
+                                                               if k.endswith("_ms")), file=sys.stderr)
+    return results
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.startup", description=__doc__.splitlines()[0])
+    p.add_argument("--app", choices=APPS, default="app.py")
+    p.add_argument("--repeat", type=int, default=3, help="procesos por modo (se reporta la mediana)")
+    p.add_argument("--out", help="guarda el resumen en JSON")
+    p.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = p.parse_args(argv)
+    if args.child:
+        print(json.dumps(child(args.child, args.app)))
+        return 0
+
+    summary = {"app": args.app, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "results": run(args.app, args.repeat)}
+    print(json.dumps(summary, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+# benchmarks/synth.py
+"""Generadores sintéticos: escalan los CSV incluidos ×N conservando su forma.
+
+Los incidentes se replican con ids nuevos y fechas desplazadas dentro del mismo
+rango; los archivos por ciudad se replican con sufijo en el nombre de ciudad
+para que la llave (estado, ciudad) siga siendo única.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from analytics.dataset import BUNDLED_FILES, DATA_DIR
+from analytics.ingest import detect_encoding
+
+
+def _to_csv_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.to_csv(buf, index=False, encoding="utf-8")
+    return buf.getvalue()
+
+
+def _read_raw(name: str) -> pd.DataFrame:
+    data = (DATA_DIR / name).read_bytes()
+    return pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False, encoding=detect_encoding(data))
+
+
+def scale_incidents(factor: int, seed: int = 0) -> bytes:
+    """PoliceKillingsUS4.csv ×factor (mismas columnas y formato de fecha mm/dd/yyyy)."""
+    base = _read_raw(BUNDLED_FILES["pk"])
+    if factor == 1:
+        return _to_csv_bytes(base)
+    rng = np.random.default_rng(seed)
+    out = pd.concat([base] * factor, ignore_index=True)
+    out["id"] = np.arange(1, len(out) + 1).astype(str)
+    dates = pd.to_datetime(base["new_date"], format="%m/%d/%Y")
+    lo, hi = dates.min(), dates.max()
+    span = (hi - lo).days + 1
+    shifted = lo + pd.to_timedelta(rng.integers(0, span, len(out)), unit="D")
+    out["new_date"] = shifted.strftime("%m/%d/%Y")
+    return _to_csv_bytes(out)
+
+
+def scale_city_file(key: str, factor: int) -> bytes:
+    """Archivo ACS por ciudad ×factor; cada réplica agrega ' #i' al nombre de ciudad."""
+    base = _read_raw(BUNDLED_FILES[key])
+    if factor == 1:
+        return _to_csv_bytes(base)
+    city_col = base.columns[1]
+    parts = []
+    for i in range(factor):
+        part = base.copy()
+        if i:
+            part[city_col] = part[city_col] + f" #{i}"
+        parts.append(part)
+    return _to_csv_bytes(pd.concat(parts, ignore_index=True))
+
+
+def bundled(key: str) -> bytes:
+    return (DATA_DIR / BUNDLED_FILES[key]).read_bytes()
@@ -0,0 +1,539 @@
+# dashboard.py
+"""Dashboard de Streamlit compartido por app.py y app2.py.
+
+Una sola implementación; las diferencias entre las dos apps son banderas de
+`Variant` (recta OLS en las dispersiones, descartar estados sin población en
+las tasas, archivos extra de pobreza/preparatoria). Caché, ingesta tipada y
+agregaciones viven en `analytics` y aplican igual a ambas entradas.
+`warm` llena las cachés del proceso antes de la primera sesión (ver server.py).
+"""
+import uuid
+from dataclasses import dataclass, replace
+
+import pandas as pd
+import streamlit as st
+
+from analytics import figures, stats, tables
+from analytics.acs import CITY_METRICS
+from analytics.cohorts import Cohort, build_cohort_index, race_names
+from analytics.cube import MAX_AGE
+from analytics.dataset import Dataset, DatasetError, append_incidents
+from analytics.diagnostics import Tracer, env_enabled
+from analytics.figures import px
+from analytics.ingest import content_hash, load_csv
+from analytics.registry import DatasetRegistry
+from analytics.weapons import CLASS_LABELS, WEAPON_CLASSES
+
+
+@dataclass(frozen=True)
+class Variant:
+    script: str                   # nombre en las trazas de diagnóstico
+    page_title: str
+    trendline: bool = False       # recta OLS en las dispersiones
+    dropna: bool = False          # estados sin población 2015 fuera de las tasas
+    extra_uploads: bool = False   # pobreza y preparatoria (subida + dispersión fig2c)
+    numbered_views: bool = False  # "1) …" en la navegación
+
+    @property
+    def uploads(self) -> dict:
+        """Archivo lógico -> nombre del CSV que se puede subir (y que entra al dataset)."""
+        return {**UPLOADS, **(EXTRA_UPLOADS if self.extra_uploads else {})}
+
+
+APP = Variant("app.py", "US Shootings 2015 - Dashboard - Emiliano Razo", trendline=True, numbered_views=True)
+APP2 = Variant("app2.py", "US Shootings Dashboard — 2015 - Emiliano Razo", dropna=True, extra_uploads=True)
+
+UPLOADS = {
+    "pk": "PoliceKillingsUS4.csv",
+    "pop": "population2015.csv",
+    "income": "MedianHouseholdIncome2015.csv",
+    "race_share": "ShareRaceByCity2.csv",
+    "races": "Races.csv",
+}
+EXTRA_UPLOADS = {
+    "poverty": "PercentagePeopleBelowPovertyLevel.csv",
+    "hs": "PercentOver25CompletedHighSchool.csv",
+}
+
+
+def read_csv_robust(file, kind=None):
+    if file is None:
+        return None
+    # parseo único por contenido: reruns y otras sesiones leen el Feather cacheado
+    return load_csv(file.getvalue(), kind)
+
+
+# ---------------- Recursos compartidos por proceso ----------------
+@st.cache_resource(show_spinner=False)
+def get_registry():
+    # un registro por proceso: los CSV incluidos (o DASHBOARD_DATA_DIR) se cargan una vez
+    # y todas las sesiones reciben el mismo Dataset de solo lectura
+    return DatasetRegistry()
+
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def get_appended(dataset_key, delta_hash, _ds, _file, _tracer):
+    _tracer.miss("dataset")
+    return append_incidents(_ds, read_csv_robust(_file, "pk"), delta_hash)
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def get_cohort_index(dataset_key, _ds):
+    # índice de bits por atributo; se construye una vez por versión de datos
+    return build_cohort_index(_ds.pk, _ds.date_col, _ds.dim)
+
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_correlations(dataset_key, year, _ds):
+    # matriz completa covariable × tasa con IC bootstrap; una vez por versión de datos y año
+    return stats.correlation_table(_ds, year)
+
+
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    # LRU compartido entre sesiones: mover un slider a un valor ya visto no reconstruye la figura
+    return figures.FigureCache(max_entries=256)
+
+
+def warm(variant: Variant) -> dict:
+    """Llena las cachés del proceso con lo que pagaría el primer visitante; devuelve los tiempos.
+
+    Dataset incluido (Feather e índice de ciudades quedan en disco), índice de
+    cohortes, correlaciones de cada año y la primera figura de Plotly. La traza
+    solo se escribe al JSONL con el diagnóstico activado (DASHBOARD_DIAGNOSTICS).
+    """
+    tracer = Tracer(True, session="warmup", script=variant.script)
+    with tracer.cached("dataset"):
+        ds = get_registry().get(kinds=variant.uploads, on_build=lambda: tracer.miss("dataset"))
+    with tracer.stage("warm.cohort_index"):
+        get_cohort_index(ds.key, ds)
+    with tracer.stage("warm.correlations"):
+        for year in ds.years:
+            get_correlations(ds.key, year, ds)
+    with tracer.stage("warm.plotly"):
+        figures.prime()
+    if env_enabled():
+        tracer.flush()
+    return tracer.record()
+
+
+@dataclass(frozen=True)
+class Page:
+    """Lo que comparten las vistas en un rerun: variante, datos y controles globales."""
+    variant: Variant
+    tracer: Tracer
+    ds: Dataset
+    year: int
+    top_n: int
+    use_rates: bool
+
+    def plot(self, fig, name, **kwargs):
+        # la serialización de Plotly ocurre aquí; se mide aparte de la construcción.
+        # Con llave estable el navegador actualiza la gráfica existente en vez de montarla de nuevo
+        with self.tracer.stage(f"render.{name}"):
+            return st.plotly_chart(fig, use_container_width=True, key=f"chart_{name}", **kwargs)
+
+    def figure(self, name, params, build):
+        """Figura cacheada por (versión de datos, variante, gráfica, controles); `build` solo corre si no está."""
+        def build_traced():
+            self.tracer.miss(f"fig.{name}")
+            return build()
+        with self.tracer.cached(f"fig.{name}"):
+            return get_figure_cache().get((self.ds.key, self.variant, name, *params), build_traced)
+
+    def scatter(self, *args, **kwargs):
+        """Dispersión con o sin recta OLS según la variante."""
+        if self.variant.trendline:
+            return figures.scatter_with_trend(*args, **kwargs)
+        return px.scatter(*args, **kwargs)
+
+
+# ---------------- VISTA 1: Estados con más ciudades con tiroteo ----------------
+def view_cities(page: Page):
+    ds, year, top_n, figure, plot = page.ds, page.year, page.top_n, page.figure, page.plot
+    st.subheader("Estados con más ciudades donde ocurrió un tiroteo policial")
+    if ds.city_col is None:
+        st.warning("No hay columna 'city' en PoliceKillingsUS4; mostraré conteo por estado.")
+    cities_by_state = tables.cities_by_state(ds, year)
+
+    fig1 = figure("fig1", (year, top_n), lambda: px.bar(
+        cities_by_state.head(top_n), x=ds.state_col, y="num_cities",
+        title=f"Top {top_n} estados por número de ciudades con tiroteo ({year})"))
+    plot(fig1, "fig1")
+
+    st.caption("Conclusión breve: California suele liderar en ciudades con incidentes, lo que indica una dispersión geográfica amplia de eventos en el estado.")
+
+
+# ---------------- VISTA 2: Salud mental + ingreso ----------------
+def view_mental_income(page: Page):
+    ds, year, top_n, use_rates, figure, plot = page.ds, page.year, page.top_n, page.use_rates, page.figure, page.plot
+    dropna = page.variant.dropna
+    st.subheader("Muertes con indicios de enfermedad mental vs ingreso")
+    deaths_by_state = tables.mental_deaths_by_state(ds, year, use_rates, dropna)
+    if deaths_by_state is None:
+        st.error("No se encontró columna 'signs_of_mental_illness' en PoliceKillingsUS4.")
+        return
+    if use_rates:
+        y_col = "rate_per_million"; y_title = "Tasa por millón"
+    else:
+        y_col = "num_deaths"; y_title = "Número de muertes"
+
+    fig2 = figure("fig2", (year, top_n, use_rates), lambda: px.bar(
+        deaths_by_state.head(top_n), x=ds.state_col, y=y_col,
+        title=f"Estados con más muertes (indic. salud mental) — {y_title} ({year})"))
+    plot(fig2, "fig2")
+
+    # ingreso estatal unido por state_id a muertes/tasa
+    merged = tables.metric_vs_mental_deaths(ds, year, "median_income", use_rates, dropna)
+    if merged is None:
+        st.info("Sube MedianHouseholdIncome2015.csv para ver la comparación con ingresos.")
+    elif merged["median_income"].notna().sum() == 0:
+        st.info("No se pudo unir ingreso mediano; revisa columnas en MedianHouseholdIncome2015.csv.")
+    else:
+        fig2b = figure("fig2b", (year, use_rates), lambda: page.scatter(
+            merged, x="median_income", y=y_col, hover_name="state_name",
+            title=f"Ingreso mediano vs {y_title} (salud mental) ({year})",
+            labels={"median_income": "Ingreso mediano 2015 (USD)", y_col: y_title}))
+        plot(fig2b, "fig2b")
+
+    if not page.variant.extra_uploads:
+        return
+    # pobreza / preparatoria vs y_col (misma tabla estatal)
+    extra_metrics = [c for c in ["poverty_rate", "percent_completed_hs"] if ds.has_metric(c)]
+    if extra_metrics:
+        x_metric = st.selectbox("Variable por ciudad (promedio estatal)", options=extra_metrics,
+                                format_func=lambda c: CITY_METRICS[c].label)
+        scatter_df = tables.metric_vs_mental_deaths(ds, year, x_metric, use_rates, dropna)
+        fig2c = figure("fig2c", (year, use_rates, x_metric), lambda: page.scatter(
+            scatter_df, x=x_metric, y=y_col, hover_name="state_name",
+            title=f"{CITY_METRICS[x_metric].label} vs {y_title} (salud mental) ({year})",
+            labels={x_metric: CITY_METRICS[x_metric].label, y_col: y_title}))
+        plot(fig2c, "fig2c")
+    else:
+        st.info("Sube PercentagePeopleBelowPovertyLevel.csv o PercentOver25CompletedHighSchool.csv para compararlos.")
+
+
+# ---------------- VISTA 3: Armas / Toy weapon / Demografía ----------------
+def view_weapons_demo(page: Page):
+    ds, year, top_n, use_rates, figure, plot = page.ds, page.year, page.top_n, page.use_rates, page.figure, page.plot
+    dropna, state_col = page.variant.dropna, ds.state_col
+    colA, colB = st.columns(2)
+
+    # A) Armas más comunes
+    with colA:
+        st.markdown("**Armas más comunes utilizadas por los atacantes**")
+        armed_counts = tables.top_weapons(ds, year)
+        if armed_counts is None:
+            st.warning("No se encontró columna 'armed'.")
+        else:
+            fig3 = figure("fig3", (year, top_n), lambda: px.bar(
+                armed_counts.head(top_n).sort_values("count"),
+                x="count", y="weapon", orientation="h", hover_data=["weapon_class"],
+                title=f"Top {top_n} armas más comunes ({year})"))
+            plot(fig3, "fig3")
+
+    # B) Toy weapon por estado
+    with colB:
+        st.markdown("**Incidentes con 'toy weapon' por estado**")
+        toy_by_state = tables.toy_by_state(ds, year, use_rates, dropna)
+        if toy_by_state is not None:
+            if use_rates:
+                y_col_t = "rate_per_million"; y_title_t = "Tasa por millón"
+            else:
+                y_col_t = "num_incidents"; y_title_t = "Número de incidentes"
+            fig4 = figure("fig4", (year, top_n, use_rates), lambda: px.bar(
+                toy_by_state.head(top_n),
+                x=state_col, y=y_col_t,
+                title=f"Tiroteos con 'toy weapon' — {y_title_t} ({year})"))
+            plot(fig4, "fig4")
+        else:
+            st.info("No se encontró columna 'armed' para analizar 'toy weapon'.")
+
+    # B2) Clases de arma por estado: la taxonomía se aplica a las etiquetas del cubo, no a las filas
+    class_df = tables.weapon_classes_by_state(ds, year, top_n)
+    if class_df is not None and not class_df.empty:
+        fig3b = figure("fig3b", (year, top_n), lambda: px.bar(
+            class_df.assign(clase=class_df["weapon_class"].map(CLASS_LABELS)),
+            x="state_name", y="count", color="clase",
+            category_orders={"clase": [CLASS_LABELS[c] for c in WEAPON_CLASSES]},
+            labels={"state_name": "Estado", "count": "Incidentes", "clase": "Clase de arma"},
+            title=f"Top {top_n} estados por incidentes, según clase de arma ({year})"))
+        plot(fig3b, "fig3b")
+
+    st.markdown("---")
+
+    # C) Cohortes demográficas: cualquier combinación de atributos, comparadas lado a lado
+    st.markdown("**Tasas por cohorte demográfica**")
+    cohort_index = get_cohort_index(ds.key, ds)
+    races_named = race_names(ds.races)  # códigos de raza con nombre (Races.csv)
+    cohorts = st.session_state.setdefault("cohorts", list(tables.DEFAULT_COHORTS))
+
+    with st.expander("Definir cohorte"):
+        with st.form("cohort_form", clear_on_submit=True):
+            f1, f2, f3 = st.columns(3)
+            c_gender = f1.multiselect("Género", cohort_index.options("gender"))
+            c_race = f1.multiselect("Raza", cohort_index.options("race"), format_func=lambda c: races_named.get(c, c))
+            c_armed = f2.multiselect("Arma", cohort_index.options("armed"))
+            c_flee = f2.multiselect("Huida", cohort_index.options("flee"))
+            c_threat = f3.multiselect("Nivel de amenaza", cohort_index.options("threat_level"))
+            c_age = f3.slider("Edad", min_value=0, max_value=MAX_AGE, value=(0, MAX_AGE))
+            c_label = st.text_input("Nombre (opcional)")
+            if st.form_submit_button("Agregar cohorte"):
+                full_age = c_age == (0, MAX_AGE)
+                new = Cohort(c_label, tuple(c_gender), tuple(c_race), tuple(c_armed), tuple(c_flee), tuple(c_threat),
+                             None if full_age else c_age[0], None if full_age else c_age[1])
+                label = c_label or new.describe(races_named)
+                if label in [c.label for c in cohorts]:
+                    label = f"{label} ({len(cohorts) + 1})"
+                cohorts.append(replace(new, label=label))
+
+    labels = [c.label for c in cohorts]
+    chosen = st.multiselect("Cohortes a comparar", labels, default=labels)
+    if st.button("Restablecer cohortes"):
+        st.session_state["cohorts"] = list(tables.DEFAULT_COHORTS)
+        st.rerun()
+
+    # denominador por raza: matriz estado × raza precalculada, la tasa es una división vectorizada
+    by_race = st.checkbox("Tasa sobre la población de la raza de la cohorte (ShareRaceByCity2)",
+                          value=ds.race_population is not None, disabled=ds.race_population is None)
+    if by_race:
+        st.caption("Población por raza = población 2015 × % de la raza en el estado, "
+                   + ("ponderado por población de cada ciudad." if ds.race_population.weighted
+                      else "promedio simple de ciudades (el archivo no trae población por ciudad)."))
+    active = tuple(c for c in cohorts if c.label in chosen)
+    cohort_df = tables.cohort_rates(ds, cohort_index, active, year, dropna=dropna, by_race=by_race)
+    if cohort_df.empty:
+        st.info("Ninguna cohorte seleccionada tiene incidentes en este año.")
+    else:
+        top_states = (cohort_df.groupby(state_col, observed=True)["rate_per_million"].max()
+                               .nlargest(top_n).index)
+        fig5 = figure("fig5", (year, top_n, active, by_race), lambda: px.bar(
+            cohort_df[cohort_df[state_col].isin(top_states)],
+            x="state_name", y="rate_per_million", color="cohort", barmode="group",
+            title=f"Top {top_n} estados por tasa de cohorte (por millón) — {year}"))
+        plot(fig5, "fig5")
+        summary = (cohort_df.groupby("cohort", sort=False)
+                            .agg(incidentes=("count", "sum"), estados=("state_id", "size")))
+        st.dataframe(summary, use_container_width=True)
+
+    # D) Dispersión % población negra vs muertes totales (si se sube ShareRaceByCity2.csv)
+    scatter_df = tables.share_black_vs_deaths(ds, year)
+    if scatter_df is not None:
+        st.markdown("**% población negra vs número de muertes (dispersión)**")
+        fig7 = figure("fig7", (year,), lambda: page.scatter(
+            scatter_df, x="share_black", y="num_deaths", hover_name="state_name",
+            labels={"share_black": "% población negra promedio (estatal)", "num_deaths": "Muertes (total)"},
+            title=f"% población negra vs muertes por estado ({year})"))
+        plot(fig7, "fig7")
+    else:
+        st.info("Sube ShareRaceByCity2.csv para ver la dispersión por % de población negra.")
+
+
+# ---------------- VISTA 4: Serie de tiempo ----------------
+# Rangos de fechas libres: cada consulta son búsquedas binarias sobre la serie diaria acumulada
+def view_series(page: Page):
+    ds, top_n, use_rates, figure, plot = page.ds, page.top_n, page.use_rates, page.figure, page.plot
+    dropna, state_col = page.variant.dropna, ds.state_col
+    st.subheader("Serie de tiempo por estado")
+    first_day, last_day = ds.series.date_range
+    if first_day is None:
+        st.info("No hay incidentes con fecha válida.")
+        return
+    c1, c2, c3, c4 = st.columns(4)
+    date_range = c1.date_input("Rango de fechas", value=(first_day, last_day),
+                               min_value=first_day, max_value=last_day)
+    freq = c2.radio("Periodo", ["Mensual", "Semanal"], horizontal=True)
+    window = c3.slider("Promedio móvil (periodos)", min_value=1, max_value=12, value=3)
+    ts_metric = c4.radio("Incidentes", ["Todos", "Salud mental"], horizontal=True)
+    # mientras se elige el rango, date_input devuelve una sola fecha
+    start, end = date_range if len(date_range) == 2 else (first_day, last_day)
+    metric = "total" if ts_metric == "Todos" else "mental"
+
+    in_range = tables.range_by_state(ds, start, end, metric, use_rates, dropna)
+    chosen = st.multiselect("Estados", options=list(ds.dim.codes),
+                            default=in_range[state_col].head(5).tolist())
+    y_title_ts = "Tasa por millón" if use_rates else "Incidentes"
+    series_df = tables.time_series(ds, start, end, "M" if freq == "Mensual" else "W", window, metric,
+                                   use_rates, states=chosen, dropna=dropna)
+    fig8 = figure("fig8", (start, end, freq, window, metric, use_rates, tuple(chosen)), lambda: px.line(
+        series_df, x="period", y="value", color=state_col,
+        labels={"period": "Periodo", "value": y_title_ts},
+        title=f"{y_title_ts} {freq.lower()} (promedio móvil de {window}) — {start} a {end}"))
+    plot(fig8, "fig8")
+
+    y_col_r = "rate_per_million" if use_rates else "count"
+    fig9 = figure("fig9", (start, end, metric, use_rates, top_n), lambda: px.bar(
+        in_range.head(top_n), x=state_col, y=y_col_r,
+        title=f"Top {top_n} estados — {y_title_ts} de {start} a {end}"))
+    plot(fig9, "fig9")
+
+
+# ---------------- VISTA 5: Mapa por estado ----------------
+# Un vector de 51 valores por métrica; la geometría (USA-states) la pone plotly.js en el navegador
+def view_map(page: Page):
+    ds, year, use_rates, figure, plot = page.ds, page.year, page.use_rates, page.figure, page.plot
+    st.subheader("Mapa por estado")
+    options = tables.map_metrics(ds)
+    metric = st.selectbox("Métrica", options=options, format_func=lambda m: tables.MAP_METRICS[m][0],
+                          key="map_metric")
+    label, has_rate = tables.MAP_METRICS[metric]
+    cohort = None
+    if metric == "cohort":
+        cohorts = st.session_state.setdefault("cohorts", list(tables.DEFAULT_COHORTS))
+        by_label = {c.label: c for c in cohorts}
+        cohort = by_label[st.selectbox("Cohorte", options=list(by_label), key="map_cohort")]
+    if has_rate and use_rates:
+        label = f"{label} (por millón)"
+    fig10 = figure("fig10", (metric, year, use_rates, cohort), lambda: figures.state_map(
+        ds.dim.codes,
+        tables.state_vector(ds, metric, year, use_rates,
+                            get_cohort_index(ds.key, ds) if cohort else None, cohort),
+        f"{label} — {year}", label, names=ds.dim.names))
+    event = plot(fig10, "fig10", on_select="rerun", selection_mode="points")
+    st.caption("Estados en gris: sin dato (p. ej. DC no tiene población 2015 para calcular tasas). "
+               "Haz clic en un estado para ver sus ciudades.")
+
+    # Detalle por ciudad: conteos del cubo + métricas ACS de la ciudad emparejada (índice de ciudades)
+    # la selección del mapa persiste entre reruns: solo un clic nuevo mueve el selectbox,
+    # así el usuario puede cambiar de estado a mano sin limpiar la selección
+    points = event.selection.points if event else []
+    clicked = (points[0].get("location") or ds.dim.codes[points[0]["point_index"]]) if points else None
+    if clicked != st.session_state.get("map_click"):
+        st.session_state["map_click"] = clicked
+        if clicked is not None:
+            st.session_state["drill_state"] = clicked
+    codes = list(ds.dim.codes)
+    drill_state = st.selectbox("Estado", options=codes, key="drill_state",
+                               format_func=lambda c: f"{c} — {ds.dim.names[codes.index(c)].title()}")
+    city_df = tables.city_drilldown(ds, codes.index(drill_state), year)
+    if city_df is None:
+        st.info("PoliceKillingsUS4 no trae columna 'city' para el detalle por ciudad.")
+    elif city_df.empty:
+        st.info(f"Sin incidentes en {drill_state} en {year}.")
+    else:
+        st.dataframe(city_df.rename(columns=tables.city_columns(city_df)), hide_index=True,
+                     use_container_width=True)
+        if ds.city_index is None:
+            st.caption("Sube los archivos ACS por ciudad (ingreso, % raza, pobreza, preparatoria) para unirlos.")
+        else:
+            st.caption("Emparejamiento con ACS: exact = mismo nombre sin sufijo del Census, "
+                       "alias = parte del nombre compuesto, fuzzy = nombre parecido en el mismo estado.")
+
+
+# ---------------- VISTA 6: Correlaciones ----------------
+# Todas las covariables contra todas las tasas en un solo cálculo NumPy (ver analytics.stats)
+def view_stats(page: Page):
+    ds, year, figure, plot = page.ds, page.year, page.figure, page.plot
+    st.subheader("Correlaciones por estado: covariables vs tasas de incidentes")
+    corr = get_correlations(ds.key, year, ds)
+    if corr is None:
+        st.info("Sube los archivos por ciudad (ingreso, % raza, pobreza, preparatoria) para calcular correlaciones.")
+        return
+    coef = st.radio("Coeficiente", options=list(stats.COEFFICIENTS), format_func=stats.COEFFICIENTS.get,
+                    horizontal=True, key="stats_coef")
+    fig11 = figure("fig11", (year, coef), lambda: px.imshow(
+        stats.grid(corr, coef), text_auto=".2f", aspect="auto", color_continuous_scale="RdBu_r",
+        zmin=0 if coef == "r2" else -1, zmax=1,
+        labels={"x": "Tasa por millón", "y": "Covariable (promedio estatal)", "color": stats.COEFFICIENTS[coef]},
+        title=f"{stats.COEFFICIENTS[coef]} por estado ({year})"))
+    plot(fig11, "fig11")
+
+    st.dataframe(
+        corr.drop(columns=["covariate", "metric"]).rename(columns={
+            "covariate_label": "Covariable", "metric_label": "Tasa", "n": "Estados", "pearson": "Pearson",
+            "spearman": "Spearman", "slope": "Pendiente", "intercept": "Intercepto", "r2": "R²",
+            "pearson_lo": "Pearson IC inf", "pearson_hi": "Pearson IC sup",
+            "slope_lo": "Pendiente IC inf", "slope_hi": "Pendiente IC sup"}),
+        hide_index=True, use_container_width=True)
+    st.caption(f"Tasas por millón con población 2015 (DC queda fuera). Pendiente = cambio en la tasa por unidad "
+               f"de la covariable. IC del {stats.CI:.0%} por bootstrap ({stats.N_BOOT} remuestreos de estados).")
+
+
+VIEWS = (
+    ("Estados con más ciudades", view_cities),
+    ("Salud mental + Ingreso", view_mental_income),
+    ("Armas / Toy weapon / Demografía", view_weapons_demo),
+    ("Serie de tiempo", view_series),
+    ("Mapa por estado", view_map),
+    ("Correlaciones", view_stats),
+)
+
+
+def run(variant: Variant):
+    """Dibuja el dashboard completo para `variant` (un rerun de Streamlit)."""
+    st.set_page_config(page_title=variant.page_title, layout="wide")
+
+    # ---------------- HTML header (requisito HTML) ----------------
+    st.markdown(
+        """
+        <div style="padding:14px;border-radius:12px;background:linear-gradient(90deg,#111,#1f2937);color:#fff;margin-bottom:10px;">
+          <h2 style="margin:0;">US Shootings Dashboard — 2015</h2>
+          <p style="margin:2px 0 0 0;font-size:14px;opacity:.85">
+            Basado en los análisis de la Tarea 1. Interactúa con los controles para ver el efecto en múltiples visualizaciones.
+          </p>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+
+    # ---------------- Diagnóstico (opcional): tiempos por etapa, caché y memoria ----------------
+    diag_box = st.sidebar.expander("Diagnóstico")
+    tracer = Tracer(diag_box.checkbox("Medir este rerun y registrar traza", value=env_enabled()),
+                    session=st.session_state.setdefault("diag_session", uuid.uuid4().hex[:8]),
+                    script=variant.script)
+
+    # ---------------- Sidebar: archivos (opcionales) ----------------
+    st.sidebar.header("1) Archivos (.csv)")
+    st.sidebar.caption("Opcional: por defecto se usan los CSV incluidos, compartidos por todas las sesiones. "
+                       "Un archivo subido reemplaza solo al incluido del mismo nombre.")
+    files = {}
+    for kind, name in variant.uploads.items():
+        files[kind] = st.sidebar.file_uploader(name, type=["csv"])
+        if kind == "pk":
+            pk_updates = st.sidebar.file_uploader(
+                "Actualizaciones de PoliceKillingsUS4 (filas nuevas o corregidas, por 'id')",
+                type=["csv"], accept_multiple_files=True)
+
+    # ---------------- Dataset: columnas clave, estados, cubo y métricas por ciudad ----------------
+    # Toda la lógica vive en `analytics` (sin Streamlit); el registro compartido cachea por versión de archivos
+    try:
+        with tracer.cached("dataset"):
+            # las subidas solo reemplazan su archivo; sin subidas se usa la entrada compartida
+            ds = get_registry().get({k: f.getvalue() for k, f in files.items() if f is not None},
+                                    kinds=files, on_build=lambda: tracer.miss("dataset"))
+            # cada lote se aplica sobre el anterior: subir uno nuevo solo procesa ese lote
+            for f in pk_updates or []:
+                ds = get_appended(ds.key, content_hash(f.getvalue()), ds, f, tracer)
+    except DatasetError as e:
+        st.error(str(e))
+        st.stop()
+
+    tracer.frame("pk", ds.pk)
+    tracer.frame("state_metrics", ds.state_metrics)
+
+    # ---------------- Sidebar: filtros globales ----------------
+    st.sidebar.header("2) Controles globales")
+    year = st.sidebar.selectbox("Año (todas las vistas salvo la serie de tiempo)", options=ds.years, index=0)
+    top_n = st.sidebar.slider("Top N estados", min_value=5, max_value=20, value=10, step=1)
+    use_rates = st.sidebar.checkbox("Mostrar tasas por millón (usa población 2015) ✅", value=True)
+    page = Page(variant, tracer, ds, year, top_n, use_rates)
+
+    # ---------------- Navegación: el servidor sabe qué vista está activa ----------------
+    # A diferencia de st.tabs (que ejecuta todas las pestañas en cada rerun), solo se
+    # calcula la vista elegida; las demás no tocan tablas ni construyen figuras.
+    views = {(f"{i}) {label}" if variant.numbered_views else label): fn
+             for i, (label, fn) in enumerate(VIEWS, start=1)}
+    view = st.radio("Vista", options=list(views), horizontal=True, key="view",
+                    label_visibility="collapsed")
+    with tracer.stage(f"view.{views[view].__name__}"):
+        views[view](page)
+
+    # Footer
+    st.caption("© Tarea 2 · Streamlit · Visualización basada en datasets del curso (2015)")
+
+    # Diagnóstico: traza del rerun al JSONL y resumen en el sidebar
+    diag = tracer.flush()
+    if diag is not None:
+        diag_box.caption(f"Sesión {diag['session']} · rerun {diag['total_ms']:.0f} ms · RSS máx {diag['max_rss_mb']} MB")
+        diag_box.dataframe(pd.DataFrame(diag["stages"]), hide_index=True, use_container_width=True)
+        diag_box.json({"cache": diag["cache"], "frames": diag["frames"]}, expanded=False)
@@ -0,0 +1,33 @@
+# server.py
+"""Arranque del dashboard con calentamiento previo.
+
+    streamlit run server.py                            # app.py
+    DASHBOARD_APP=app2.py streamlit run server.py
+
+Con `streamlit run app.py` el script no corre hasta que llega el primer
+visitante, así que esa sesión paga importar plotly.express, cargar los CSV y precalcular
+agregados antes de ver la primera gráfica. Aquí eso ocurre en el arranque
+(lifespan de `st.App`), antes de aceptar conexiones: la primera sesión ya
+encuentra llenas las cachés del proceso (ver `dashboard.warm`).
+"""
+import os
+from contextlib import asynccontextmanager
+
+import streamlit as st
+
+import dashboard
+
+VARIANTS = {"app.py": dashboard.APP, "app2.py": dashboard.APP2}
+SCRIPT = os.environ.get("DASHBOARD_APP", "app.py")
+if SCRIPT not in VARIANTS:
+    raise SystemExit(f"DASHBOARD_APP debe ser uno de {', '.join(VARIANTS)} (recibido: {SCRIPT!r})")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    diag = dashboard.warm(VARIANTS[SCRIPT])
+    print(f"Calentamiento de {SCRIPT} listo en {diag['total_ms']:.0f} ms", flush=True)
+    yield
+
+
+app = st.App(SCRIPT, lifespan=lifespan)
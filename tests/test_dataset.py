@@ -0,0 +1,39 @@
+# tests/test_dataset.py
+"""`append_incidents` contra una reconstrucción completa con los mismos incidentes."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from analytics.dataset import BUNDLED_FILES, DATA_DIR, append_incidents, build_dataset
+from analytics.ingest import load_csv
+
+HEADER = (DATA_DIR / BUNDLED_FILES["pk"]).read_bytes().split(b"\n", 1)[0].rstrip(b"\r")
+METRICS = ("total", "mental", "cities", "toy", "firearm")
+
+
+def _bundled():
+    return {k: load_csv((DATA_DIR / name).read_bytes(), k) for k, name in BUNDLED_FILES.items()}
+
+
+@pytest.mark.parametrize("state,state_name", [("WA", "WASHINGTON"), ("ZZ", "ZZ STATE")])
+def test_append_matches_rebuild(state, state_name):
+    row = (f"999999,Test Person,shot,toy weapon,30,M,W,Nowhere,{state},{state_name},"
+           "TRUE,attack,Not fleeing,FALSE,03/04/2016").encode()
+    frames = _bundled()
+    appended = append_incidents(build_dataset(frames), load_csv(HEADER + b"\n" + row + b"\n", "pk"))
+
+    pk_bytes = (DATA_DIR / BUNDLED_FILES["pk"]).read_bytes().rstrip(b"\r\n")
+    rebuilt = build_dataset({**frames, "pk": load_csv(pk_bytes + b"\n" + row + b"\n", "pk")})
+
+    assert list(appended.dim.codes) == list(rebuilt.dim.codes)
+    assert len(appended.pk) == len(rebuilt.pk)
+    assert (appended.pk["state_id"] >= 0).sum() == (rebuilt.pk["state_id"] >= 0).sum()
+    for year in rebuilt.years:
+        for metric in METRICS:
+            np.testing.assert_array_equal(appended.cube.state_values(metric, year),
+                                          rebuilt.cube.state_values(metric, year))
+    first, last = rebuilt.series.date_range
+    np.testing.assert_array_equal(appended.series.range_counts(first, last),
+                                  rebuilt.series.range_counts(first, last))
+    pd.testing.assert_frame_equal(appended.state_metrics, rebuilt.state_metrics)
+    np.testing.assert_array_equal(appended.race_population.population, rebuilt.race_population.population)
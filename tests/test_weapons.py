@@ -0,0 +1,30 @@
+# tests/test_weapons.py
+"""Clases de arma: etiquetas compuestas y conteo de 'toy weapon' por estado."""
+from analytics import tables
+from analytics.dataset import BUNDLED_FILES, DATA_DIR, build_dataset
+from analytics.ingest import load_csv
+from analytics.weapons import classes_in, classify
+
+
+def test_compound_labels_include_each_part():
+    assert classify("toy weapon and knife") == "multi"
+    assert classes_in("toy weapon and knife") == {"multi", "toy", "blade"}
+    assert classes_in("gun and toy") == {"multi", "firearm", "toy"}
+    assert classes_in("nail gun") == {"other"}
+
+
+def test_toy_by_state_counts_compound_labels():
+    frames = {k: load_csv((DATA_DIR / name).read_bytes(), k) for k, name in BUNDLED_FILES.items()}
+    pk = frames["pk"].astype({"armed": str})
+    pk.loc[pk.index[:40:4], "armed"] = "toy weapon and knife"
+    pk.loc[pk.index[1:40:4], "armed"] = "gun and toy"
+    ds = build_dataset({**frames, "pk": pk})
+    year = ds.years[0]
+
+    got = tables.toy_by_state(ds, year, use_rates=False)
+    # filtro de las apps originales: la palabra "toy" en cualquier parte de la etiqueta
+    rows = ds.pk[(ds.pk[ds.date_col].dt.year == year)
+                 & ds.pk["armed"].astype(str).str.lower().str.contains(r"\btoy\b")]
+    expected = rows.groupby(ds.state_col, observed=True).size()
+    assert dict(zip(got[ds.state_col].astype(str), got["num_incidents"].astype(int))) == \
+        {str(k): int(v) for k, v in expected.items() if v}